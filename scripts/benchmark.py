@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the Silksong crypto and translation pipeline
+"""
+import io
+import os
+import sys
+import json
+import time
+import base64
+import urllib.request
+import shutil
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.crypto import SilksongCrypto, summarize_results
+from src.async_engine import AsyncBatchRunner, ProviderLimits
+from src.tokens import estimate_request_tokens, estimate_tokens
+
+PROJECT_ROOT = Path(__file__).parent.parent
+SOURCE_DIR = PROJECT_ROOT / "data" / "silksong" / "source" / "SILKSONG_EN"
+GLOSSARY_FILE = PROJECT_ROOT / "data" / "silksong" / "glossaries" / "final_glossary.json"
+
+
+def build_corpus(target: Path, scale: int) -> int:
+    """Copy every EN_*.json asset `scale` times into target, return total bytes"""
+    target.mkdir(parents=True, exist_ok=True)
+    total = 0
+    for json_file in sorted(SOURCE_DIR.glob("*.json")):
+        for i in range(scale):
+            copy = target / f"{json_file.stem}-{i:03d}.json"
+            shutil.copyfile(json_file, copy)
+            total += copy.stat().st_size
+    return total
+
+
+def bench_folder_scaling(scale: int, jobs_list):
+    """Time decrypt_folder/encrypt_folder over a scaled corpus for each worker count"""
+    crypto = SilksongCrypto()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        encrypted = tmp / "encrypted"
+        corpus_bytes = build_corpus(encrypted, scale)
+        corpus_mb = corpus_bytes / (1024 * 1024)
+        print(f"Corpus: {len(list(encrypted.glob('*.json')))} files, {corpus_mb:.1f} MB (scale x{scale})")
+        print(f"{'operation':<10} {'jobs':>4} {'seconds':>8} {'MB/s':>8} {'speedup':>8}")
+        
+        for operation in ("decrypt", "encrypt"):
+            baseline = None
+            for jobs in jobs_list:
+                source = encrypted if operation == "decrypt" else tmp / "decrypted"
+                output = tmp / ("decrypted" if operation == "decrypt" else f"encrypted-{jobs}")
+                folder_method = crypto.decrypt_folder if operation == "decrypt" else crypto.encrypt_folder
+                
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results = folder_method(source, output, workers=jobs)
+                elapsed = time.perf_counter() - started
+                
+                summary = summarize_results(results, elapsed)
+                if summary["error"]:
+                    print(f"  {summary['error']} files failed during {operation}")
+                
+                baseline = baseline or elapsed
+                mb = summary["bytes_in"] / (1024 * 1024)
+                print(f"{operation:<10} {jobs:>4} {elapsed:>8.2f} {mb / elapsed:>8.1f} {baseline / elapsed:>7.2f}x")
+
+
+def _legacy_encrypt_string(crypto: SilksongCrypto, text: str) -> str:
+    """Pre-buffer-API encrypt path: padder/encryptor output built by concatenation"""
+    from cryptography.hazmat.primitives import padding
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    encryptor = Cipher(algorithms.AES(crypto.key), modes.ECB()).encryptor()
+    padder = padding.PKCS7(128).padder()
+    padded_data = padder.update(text.encode('utf-8')) + padder.finalize()
+    encrypted = encryptor.update(padded_data) + encryptor.finalize()
+    return base64.b64encode(encrypted).decode('ascii')
+
+
+def _legacy_decrypt_string(crypto: SilksongCrypto, encrypted_b64: str) -> str:
+    """Pre-buffer-API decrypt path: decryptor/unpadder output built by concatenation"""
+    from cryptography.hazmat.primitives import padding
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    decryptor = Cipher(algorithms.AES(crypto.key), modes.ECB()).decryptor()
+    decrypted_padded = decryptor.update(base64.b64decode(encrypted_b64)) + decryptor.finalize()
+    unpadder = padding.PKCS7(128).unpadder()
+    decrypted = unpadder.update(decrypted_padded) + unpadder.finalize()
+    return decrypted.decode('utf-8')
+
+
+class _NullSink:
+    """Write target that discards data, so stream benchmarks don't count the output copy"""
+    
+    def write(self, data) -> int:
+        return len(data)
+
+
+def _measure(func, *args):
+    """Run func once, return (seconds, peak traced bytes)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def bench_buffers(size_mb: int):
+    """Compare time/MB and peak allocations of legacy, string, buffer and stream paths"""
+    crypto = SilksongCrypto()
+    text = (os.urandom(size_mb * 1024 * 1024 * 3 // 4).hex())[:size_mb * 1024 * 1024]
+    plaintext = text.encode('utf-8')
+    encrypted_b64 = crypto.encrypt_string(text)
+    encrypted_raw = base64.b64decode(encrypted_b64)
+    
+    encrypted_ascii = encrypted_b64.encode('ascii')
+    
+    def stream_encrypt():
+        crypto.encrypt_stream(io.BytesIO(plaintext), _NullSink())
+    
+    def stream_decrypt():
+        crypto.decrypt_stream(io.BytesIO(encrypted_ascii), _NullSink())
+    
+    cases = [
+        ("encrypt legacy", _legacy_encrypt_string, crypto, text),
+        ("encrypt_string", crypto.encrypt_string, text),
+        ("encrypt_into", crypto.encrypt_into, plaintext),
+        ("encrypt_stream", stream_encrypt),
+        ("decrypt legacy", _legacy_decrypt_string, crypto, encrypted_b64),
+        ("decrypt_string", crypto.decrypt_string, encrypted_b64),
+        ("decrypt_into", crypto.decrypt_into, encrypted_raw),
+        ("decrypt_stream", stream_decrypt),
+    ]
+    
+    print(f"Payload: {size_mb} MB")
+    print(f"{'method':<16} {'ms/MB':>8} {'peak MB':>8} {'peak/payload':>13}")
+    for label, func, *args in cases:
+        elapsed, peak = _measure(func, *args)
+        print(f"{label:<16} {elapsed * 1000 / size_mb:>8.2f} {peak / (1024 * 1024):>8.1f} "
+              f"{peak / len(plaintext):>12.2f}x")
+
+
+def _http_translate_batch(url: str, texts):
+    """Minimal OpenAI-compatible chat call, one numbered line per text"""
+    prompt = "\n".join(f"{i + 1}. {text}" for i, text in enumerate(texts))
+    payload = json.dumps({
+        "model": "fake-model",
+        "messages": [
+            {"role": "system", "content": "Translate to Ukrainian. Keep numbering."},
+            {"role": "user", "content": prompt},
+        ],
+    }).encode('utf-8')
+    request = urllib.request.Request(url, data=payload, headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        content = json.load(response)["choices"][0]["message"]["content"]
+    return [line.split(". ", 1)[-1] for line in content.split("\n")]
+
+
+def bench_provider(batches: int, latency: float, rate_limit_rate: float, concurrency_list, rpm: float):
+    """Throughput of AsyncBatchRunner against the local fake OpenAI server"""
+    from scripts.fake_openai_server import start_in_thread
+    
+    server = start_in_thread(latency=latency, rate_limit_rate=rate_limit_rate)
+    url = f"http://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+    jobs = [[f"Line {b}-{i}: the Citadel rings its bells." for i in range(10)] for b in range(batches)]
+    
+    print(f"Fake server: {latency * 1000:.0f} ms latency, {rate_limit_rate:.0%} 429s, {batches} batches")
+    print(f"{'concurrency':>11} {'seconds':>8} {'req/s':>7} {'retries':>8} {'failed':>7}")
+    try:
+        for concurrency in concurrency_list:
+            runner = AsyncBatchRunner(ProviderLimits(concurrency, requests_per_minute=rpm),
+                                      max_retries=8, base_delay=0.05)
+            results = runner.run(jobs, lambda texts: _http_translate_batch(url, texts),
+                                 cost=estimate_request_tokens)
+            failed = sum(isinstance(r, Exception) for r in results)
+            seconds = runner.stats["seconds"]
+            print(f"{concurrency:>11} {seconds:>8.2f} {batches / seconds:>7.1f} "
+                  f"{runner.stats['retries']:>8} {failed:>7}")
+    finally:
+        server.shutdown()
+
+
+def _load_source_units():
+    """All EN units of the bundled corpus (needs the core submodule)"""
+    from src.config import SILKSONG_CONFIG
+    from src.processor import SilksongProcessor
+    
+    processor = SilksongProcessor(SILKSONG_CONFIG)
+    source_dir = SOURCE_DIR / "._Decrypted"
+    return [unit for path in sorted(source_dir.glob("EN_*.txt")) for unit in processor.iter_units(path)]
+
+
+def bench_glossary(repeat: int):
+    """Glossary matcher build/scan time over the corpus and prompt tokens saved per request"""
+    from src.glossary_matcher import GlossaryMatcher
+    from src.dedup import dedupe_units
+    from src.batching import pack_batches
+    
+    with open(GLOSSARY_FILE, 'r', encoding='utf-8') as f:
+        glossary = json.load(f)["translations"]
+    units = _load_source_units()
+    texts = [unit.original_text for unit in units]
+    corpus_mb = sum(len(text.encode('utf-8')) for text in texts) / (1024 * 1024)
+    
+    started = time.perf_counter()
+    matcher = GlossaryMatcher(glossary)
+    build = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    for _ in range(repeat):
+        hits = sum(len(matcher.find_terms(text)) for text in texts)
+    scan = (time.perf_counter() - started) / repeat
+    
+    # Naive baseline: substring test of every term against every text
+    lowered_terms = [term.lower() for term in glossary]
+    started = time.perf_counter()
+    naive_hits = sum(1 for text in texts for term in lowered_terms if term in text.lower())
+    naive = time.perf_counter() - started
+    
+    print(f"Glossary: {len(glossary)} terms, corpus: {len(texts)} texts, {corpus_mb:.2f} MB")
+    print(f"Matcher build: {build * 1000:.1f} ms")
+    print(f"Matcher scan:  {scan * 1000:.1f} ms ({corpus_mb / scan:.1f} MB/s), {hits} term hits")
+    print(f"Naive scan:    {naive * 1000:.1f} ms, {naive_hits} substring hits (no word boundaries)")
+    
+    plan = pack_batches(list(dedupe_units(units).groups.values()))
+    full_tokens = sum(estimate_tokens(f"{term}: {value}") for term, value in glossary.items())
+    injected = [matcher.subset(units[0].original_text for units in batch) for batch in plan.batches]
+    injected_tokens = [sum(estimate_tokens(f"{term}: {value}") for term, value in subset.items())
+                       for subset in injected]
+    average = sum(injected_tokens) / len(injected_tokens)
+    print(f"Per request: {sum(map(len, injected)) / len(injected):.1f} terms injected instead of {len(glossary)}, "
+          f"~{average:.0f} glossary tokens instead of {full_tokens} "
+          f"({1 - average / full_tokens:.0%} saved over {len(plan.batches)} requests)")
+
+
+class StubProvider:
+    """Offline stand-in for an AI provider: returns the source with a marker"""
+    
+    model_name = "stub"
+    
+    def translate_batch(self, texts, source_lang, target_lang, glossary=None):
+        return [f"[UA] {text}" for text in texts]
+
+
+def _suite_cases(scale: int, tmp: Path):
+    """Build the x`scale` corpus in tmp and return [(case name, func, bytes, entries)]"""
+    from src.config import SILKSONG_CONFIG
+    from src.processor import SilksongProcessor
+    from src.dedup import dedupe_units, fan_out
+    from src.batching import pack_batches
+    
+    crypto = SilksongCrypto()
+    processor = SilksongProcessor(SILKSONG_CONFIG)
+    provider = StubProvider()
+    encrypted = tmp / "encrypted"
+    decrypted = tmp / "decrypted"
+    encrypted_bytes = build_corpus(encrypted, scale)
+    with contextlib.redirect_stdout(io.StringIO()):
+        crypto.decrypt_folder(encrypted, decrypted)
+    text_files = sorted(decrypted.glob("*.txt"))
+    text_bytes = sum(path.stat().st_size for path in text_files)
+    parsed = {path: processor.read_file(path) for path in text_files}
+    entries = sum(len(units) for units in parsed.values())
+    
+    def quiet(func, *args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func(*args, **kwargs)
+    
+    def decrypt():
+        quiet(crypto.decrypt_folder, encrypted, tmp / "bench-decrypted")
+    
+    def encrypt():
+        quiet(crypto.encrypt_folder, decrypted, tmp / "bench-encrypted")
+    
+    def parse():
+        for path in text_files:
+            processor.read_file(path)
+    
+    # Whole corpus held at once: unit objects vs the columnar store (compare peak MB)
+    def load_units():
+        return {path: processor.read_file(path) for path in text_files}
+    
+    def load_corpus():
+        return processor.read_corpus(text_files)
+    
+    def write():
+        out = tmp / "bench-written"
+        out.mkdir(exist_ok=True)
+        for path, units in parsed.items():
+            processor.write_file(out / path.name, units)
+        shutil.rmtree(out)
+    
+    def round_trip():
+        work = tmp / "round-trip"
+        work.mkdir()
+        quiet(crypto.decrypt_folder, encrypted, work / "decrypted")
+        units_by_file = {path: processor.read_file(path) for path in sorted((work / "decrypted").glob("*.txt"))}
+        dedup = dedupe_units(unit for units in units_by_file.values() for unit in units)
+        for batch in pack_batches(list(dedup.groups.values())).batches:
+            translations = provider.translate_batch([units[0].original_text for units in batch], "EN", "UA")
+            for units, translation in zip(batch, translations):
+                fan_out(units, translation)
+        (work / "translated").mkdir()
+        for path, units in units_by_file.items():
+            processor.write_file(work / "translated" / path.name, units)
+        quiet(crypto.encrypt_folder, work / "translated", work / "encrypted")
+        shutil.rmtree(work)
+    
+    return [
+        ("decrypt", decrypt, encrypted_bytes, entries),
+        ("encrypt", encrypt, text_bytes, entries),
+        ("parse", parse, text_bytes, entries),
+        ("load_units", load_units, text_bytes, entries),
+        ("load_corpus", load_corpus, text_bytes, entries),
+        ("write", write, text_bytes, entries),
+        ("round_trip", round_trip, encrypted_bytes, entries),
+    ]
+
+
+def bench_suite(scales, repeat: int, memory: bool):
+    """Throughput (best of repeat) and peak traced memory of every pipeline stage per scale"""
+    results = {}
+    print(f"{'case':<22} {'seconds':>8} {'MB/s':>8} {'entries/s':>11} {'peak MB':>8}")
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name, func, size, entries in _suite_cases(scale, Path(tmp)):
+                elapsed = min(_timed(func) for _ in range(repeat))
+                peak = _measure(func)[1] if memory else 0
+                label = f"{name}@x{scale}"
+                results[label] = {
+                    "seconds": round(elapsed, 4),
+                    "mb_per_s": round(size / (1024 * 1024) / elapsed, 2),
+                    "entries_per_s": round(entries / elapsed),
+                    "peak_mb": round(peak / (1024 * 1024), 2),
+                }
+                row = results[label]
+                print(f"{label:<22} {elapsed:>8.3f} {row['mb_per_s']:>8.1f} {row['entries_per_s']:>11} "
+                      f"{row['peak_mb'] if memory else '-':>8}")
+    return results
+
+
+def _timed(func) -> float:
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def compare_results(baseline: dict, current: dict, threshold: float) -> list:
+    """Cases whose throughput dropped or peak memory grew by more than threshold"""
+    regressions = []
+    for label, now in current.items():
+        before = baseline.get(label)
+        if not before:
+            continue
+        if now["mb_per_s"] < before["mb_per_s"] * (1 - threshold):
+            regressions.append(f"{label}: {before['mb_per_s']} -> {now['mb_per_s']} MB/s")
+        if before["peak_mb"] and now["peak_mb"] > before["peak_mb"] * (1 + threshold):
+            regressions.append(f"{label}: peak {before['peak_mb']} -> {now['peak_mb']} MB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Silksong crypto")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+    
+    folders = subparsers.add_parser("folders", help="Folder decrypt/encrypt scaling with --jobs")
+    folders.add_argument("--scale", type=int, default=50,
+                         help="How many copies of data/silksong/source to benchmark on (default: 50)")
+    folders.add_argument("--jobs", default="1,2,4,0",
+                         help="Comma separated worker counts to compare (0 = all cores)")
+    
+    buffers = subparsers.add_parser("buffers", help="Time and peak memory of the in-memory AES paths")
+    buffers.add_argument("--size-mb", type=int, default=32, help="Payload size in MB (default: 32)")
+    
+    provider = subparsers.add_parser("provider", help="Async engine throughput against a fake OpenAI server")
+    provider.add_argument("--batches", type=int, default=200, help="Number of requests to send")
+    provider.add_argument("--latency", type=float, default=0.05, help="Fake server latency in seconds")
+    provider.add_argument("--rate-limit-rate", type=float, default=0.05, help="Share of 429 responses")
+    provider.add_argument("--concurrency", default="1,4,16", help="Comma separated concurrency levels")
+    provider.add_argument("--rpm", type=float, help="Requests per minute bucket (default: unlimited)")
+    
+    glossary = subparsers.add_parser("glossary", help="Glossary matcher speed and prompt tokens saved")
+    glossary.add_argument("--repeat", type=int, default=5, help="Scan repetitions to average")
+    
+    suite = subparsers.add_parser("suite", help="Crypto, parse, write and round-trip throughput with a stub provider")
+    suite.add_argument("--scales", default="1,10,100",
+                       help="Comma separated corpus multipliers of data/silksong/source (default: 1,10,100)")
+    suite.add_argument("--repeat", type=int, default=3, help="Runs per case, the fastest is kept")
+    suite.add_argument("--no-memory", dest="memory", action="store_false",
+                       help="Skip the extra tracemalloc run that measures peak memory")
+    suite.add_argument("--save", help="Write results as JSON (e.g. a baseline to compare against later)")
+    suite.add_argument("--compare", help="Baseline JSON from --save; exit 1 on regressions")
+    suite.add_argument("--threshold", type=float, default=0.15,
+                       help="Allowed throughput drop / peak memory growth for --compare (default: 0.15)")
+    
+    args = parser.parse_args()
+    
+    if args.benchmark == "suite":
+        results = bench_suite([int(s) for s in args.scales.split(",")], args.repeat, args.memory)
+        if args.save:
+            Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+            with open(args.save, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            print(f"Results saved to: {args.save}")
+        if args.compare:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                regressions = compare_results(json.load(f), results, args.threshold)
+            for regression in regressions:
+                print(f"REGRESSION {regression}")
+            if regressions:
+                return 1
+            print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+    elif args.benchmark == "folders":
+        bench_folder_scaling(args.scale, [int(j) for j in args.jobs.split(",")])
+    elif args.benchmark == "buffers":
+        bench_buffers(args.size_mb)
+    elif args.benchmark == "glossary":
+        bench_glossary(args.repeat)
+    elif args.benchmark == "provider":
+        bench_provider(args.batches, args.latency, args.rate_limit_rate,
+                       [int(c) for c in args.concurrency.split(",")], args.rpm)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
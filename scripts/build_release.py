@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Build the installable release zip from translated .txt files in one step
+"""
+import sys
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.release import RELEASE_PREFIX, RELEASE_ZIP_NAME, build_release
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encrypt translated files straight into the release zip")
+    parser.add_argument("source_folder", nargs="?", default="data/silksong/silksong_ua",
+                        help="Translated .txt files (default: data/silksong/silksong_ua)")
+    parser.add_argument("--version", help=f"Release version; writes releases/<version>/{RELEASE_ZIP_NAME}")
+    parser.add_argument("--output", "-o", help=f"Zip path (default: {RELEASE_ZIP_NAME} or the --version path)")
+    parser.add_argument("--jobs", "-j", type=int, default=0,
+                        help="Number of worker processes (0 = all CPU cores, default: 0)")
+    parser.add_argument("--prefix", default=RELEASE_PREFIX,
+                        help=f"Folder inside the zip, relative to Hollow Knight Silksong_Data "
+                             f"(default: {RELEASE_PREFIX})")
+    parser.add_argument("--manifest", help="Also write the checksum manifest (sha256sum format) to this path")
+
+    args = parser.parse_args()
+
+    source_folder = Path(args.source_folder)
+    if not source_folder.exists():
+        print(f"Error: Source folder not found: {source_folder}")
+        return 1
+
+    if args.output:
+        zip_path = Path(args.output)
+    elif args.version:
+        zip_path = Path("releases") / args.version / RELEASE_ZIP_NAME
+    else:
+        zip_path = Path(RELEASE_ZIP_NAME)
+
+    result = build_release(source_folder, zip_path, workers=args.jobs, prefix=args.prefix)
+
+    for name in result.skipped:
+        print(f"  Skipping {name}: insufficient lines")
+    print(result.manifest(), end="")
+    print(f"Built {zip_path}: {len(result.entries)} assets, {result.size} bytes, {result.seconds:.2f}s")
+
+    if args.manifest:
+        Path(args.manifest).write_text(result.manifest(), encoding='utf-8')
+        print(f"Checksum manifest saved to: {args.manifest}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Check translated DE_* files for broken markup: page/speaker tags, placeholders, entities, length
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.src.core.config import config_manager
+from src.config import SILKSONG_CONFIG
+from src.crypto import resolve_workers
+from src.markup import ERROR_KINDS, markup_report, validate_corpus
+from src.processor import SilksongProcessor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Markup and placeholder validation of the Silksong outputs")
+    parser.add_argument("--source", help="Folder with EN_* files (default: project source dir)")
+    parser.add_argument("--output", help="Folder with DE_* files (default: project output dir)")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes (0 = all CPU cores, default: 1)")
+    parser.add_argument("--json", dest="json_path",
+                        help="Write every issue as JSON to this path, or '-' for stdout")
+    parser.add_argument("--kind", action="append",
+                        help="Only list issues of this kind (repeatable): tags, placeholders, entities, "
+                             "line_breaks, apostrophes, length")
+    parser.add_argument("--top", type=int, default=20, help="Issues to list (0 = all)")
+
+    args = parser.parse_args()
+
+    config_manager.register_project(SILKSONG_CONFIG)
+    config = config_manager.get_project("silksong")
+    source_dir = Path(args.source or config.source_dir)
+    output_dir = Path(args.output or config.get_output_dir())
+
+    prefix = f"{config.source_lang}_"
+    target_prefix = f"{config.target_lang_code}_"
+    sources = sorted(path for path in source_dir.glob(f"{prefix}*") if path.suffix in ('.txt', '.json'))
+    if not sources:
+        print(f"No {prefix}* files in {source_dir}")
+        return 1
+    pairs = [(path, output_dir / (path.stem.replace(prefix, target_prefix, 1) + '.txt')) for path in sources]
+
+    started = time.perf_counter()
+    results = validate_corpus(pairs, SilksongProcessor(config), resolve_workers(args.jobs, len(pairs)))
+    report = markup_report(results, time.perf_counter() - started)
+
+    if args.json_path == "-":
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return 1 if report["totals"]["errors"] else 0
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    totals = report["totals"]
+    print(f"Checked {totals['checked']} entries in {totals['files']} files, {report['seconds']:.2f}s: "
+          f"{totals['invalid']} with issues, {totals['errors']} errors")
+    for kind, count in totals["kinds"].items():
+        print(f"  {kind:<13} {count:6}{'  (error)' if kind in ERROR_KINDS else ''}")
+
+    listed = 0
+    for result in results:
+        for issue in result.issues:
+            if args.kind and issue.kind not in args.kind:
+                continue
+            if args.top and listed >= args.top:
+                break
+            print(f"  {result.output}  {issue.key}: {issue.kind}, {issue.message}")
+            listed += 1
+    if args.json_path:
+        print(f"Report saved to: {args.json_path}")
+    # Non-zero exit when anything would break in game, for use before a release
+    return 1 if totals["errors"] else 0
+
+
+if __name__ == "__main__":
+    exit(main())
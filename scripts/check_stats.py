@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 """
-Check translation statistics - what was skipped and why
+Check translation statistics: real coverage of the DE_* outputs against the EN_* sources
 """
 import sys
+import json
+import time
+import argparse
 from pathlib import Path
 
 # Add project root to path
@@ -10,65 +13,83 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 from core.src.core.config import config_manager
 from src.config import SILKSONG_CONFIG
+from src.corpus_index import DEFAULT_INDEX_PATH, open_index
+from src.coverage import analyze_corpus, coverage_report
+from src.crypto import resolve_workers
 from src.processor import SilksongProcessor
 
+
 def main():
+    parser = argparse.ArgumentParser(description="Translation coverage of the Silksong outputs")
+    parser.add_argument("--source", help="Folder with EN_* files (default: project source dir)")
+    parser.add_argument("--output", help="Folder with DE_* files (default: project output dir)")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Worker processes (0 = all CPU cores, default: 1)")
+    parser.add_argument("--json", dest="json_path",
+                        help="Write the full report (per-file coverage, untranslated/identical keys) "
+                             "as JSON to this path, or '-' for stdout")
+    parser.add_argument("--top", type=int, default=10, help="Files with the lowest coverage to list")
+    parser.add_argument("--keys", action="store_true", help="Also print untranslated and identical keys")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH,
+                        help="Prebuilt corpus index, rebuilt when sources or outputs change")
+    parser.add_argument("--no-index", dest="index", action="store_const", const=None,
+                        help="Parse every file instead of using the corpus index")
+
+    args = parser.parse_args()
+
     config_manager.register_project(SILKSONG_CONFIG)
     config = config_manager.get_project("silksong")
+    source_dir = Path(args.source or config.source_dir)
+    output_dir = Path(args.output or config.get_output_dir())
+
+    prefix = f"{config.source_lang}_"
+    target_prefix = f"{config.target_lang_code}_"
+    sources = sorted(path for path in source_dir.glob(f"{prefix}*") if path.suffix in ('.txt', '.json'))
+    if not sources:
+        print(f"No {prefix}* files in {source_dir}")
+        return 1
+    # Encrypted .json sources are compared with the .txt outputs of the same name
+    pairs = [(path, output_dir / (path.stem.replace(prefix, target_prefix, 1) + '.txt')) for path in sources]
+
+    started = time.perf_counter()
     processor = SilksongProcessor(config)
-    
-    # Get all files
-    files = processor.get_all_source_files()
-    
-    total_units = 0
-    empty_units = 0
-    short_units = 0
-    technical_units = 0
-    
-    print("Analyzing translation units...")
-    print("=" * 50)
-    
-    for i, file_path in enumerate(files, 1):
-        print(f"Processing {i}/{len(files)}: {file_path.name}")
-        
-        try:
-            units = processor.read_file(file_path)
-            
-            for unit in units:
-                total_units += 1
-                text = unit.original_text.strip()
-                
-                # Check for empty/whitespace
-                if not text:
-                    empty_units += 1
-                    continue
-                
-                # Check for very short content
-                if len(text) <= 2:
-                    short_units += 1
-                    print(f"  Short: '{text}' (key: {unit.key})")
-                    continue
-                
-                # Check for technical content
-                if (text.startswith(("debug", "config", "path", "data")) or 
-                    text.endswith((".json", ".txt", ".dat")) or
-                    text.isdigit()):
-                    technical_units += 1
-                    print(f"  Technical: '{text}' (key: {unit.key})")
-                    continue
-                    
-        except Exception as e:
-            print(f"  Error: {e}")
-    
-    print("\n" + "=" * 50)
-    print("📊 STATISTICS:")
-    print(f"Total units found: {total_units}")
-    print(f"Empty units: {empty_units}")
-    print(f"Short units (≤2 chars): {short_units}")
-    print(f"Technical units: {technical_units}")
-    print(f"Expected translatable: {total_units - empty_units - short_units - technical_units}")
-    print(f"Actually translated: 5553")
-    print(f"Difference: {(total_units - empty_units - short_units - technical_units) - 5553}")
+    if args.index:
+        processor.index = open_index(processor, sources, Path(args.index), output_dir)
+    results = analyze_corpus(pairs, processor, resolve_workers(args.jobs, len(pairs)))
+    report = coverage_report(results, time.perf_counter() - started)
+    if processor.index is not None:
+        processor.index.close()
+
+    if args.json_path == "-":
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return 0
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    totals = report["totals"]
+    print(f"Coverage: {totals['translated']}/{totals['translatable']} translatable units "
+          f"({totals['coverage']:.1%}) in {totals['files']} files, {report['seconds']:.2f}s")
+    print(f"Untranslated: {totals['untranslated']}, identical to source: {totals['identical']}, "
+          f"orphaned: {totals['orphaned']}, missing outputs: {totals['missing_outputs']}")
+    print(f"Skipped: {totals['empty']} empty, {totals['technical']} short/technical of {totals['units']} units")
+    print(f"Source: {totals['source_chars']} chars / {totals['source_words']} words, "
+          f"target: {totals['target_chars']} chars / {totals['target_words']} words")
+
+    incomplete = sorted((r for r in results if r.coverage < 1.0), key=lambda r: r.coverage)
+    for result in incomplete[:args.top]:
+        print(f"  {result.coverage:6.1%}  {result.file}  "
+              f"({len(result.untranslated)} untranslated, {len(result.identical)} identical)")
+        if args.keys:
+            for key in result.untranslated:
+                print(f"      untranslated: {key}")
+            for key in result.identical:
+                print(f"      identical:    {key}")
+    if args.json_path:
+        print(f"Report saved to: {args.json_path}")
+    return 0
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    exit(main())
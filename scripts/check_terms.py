@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Check glossary consistency: source entries with a glossary term whose translation does not use the glossary rendering
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.src.core.config import config_manager
+from src.config import SILKSONG_CONFIG
+from src.glossary_batches import load_final_glossary
+from src.processor import SilksongProcessor
+from src.text_index import DEFAULT_TEXT_INDEX_PATH, open_text_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Glossary consistency of the Silksong translations")
+    parser.add_argument("--source", help="Folder with EN_* files (default: project source dir)")
+    parser.add_argument("--output", help="Folder with DE_* files (default: project output dir)")
+    parser.add_argument("--glossary", default=f"./data/{SILKSONG_CONFIG.name}/glossaries/final_glossary.json",
+                        help="Glossary with the expected translations")
+    parser.add_argument("--index", default=DEFAULT_TEXT_INDEX_PATH,
+                        help="Full-text index file; only changed files are re-indexed")
+    parser.add_argument("--term", action="append", help="Only check this glossary term (repeatable)")
+    parser.add_argument("--find", help="List entries containing these words (English, or Ukrainian in any form)")
+    parser.add_argument("--json", dest="json_path",
+                        help="Write every mismatch as JSON to this path, or '-' for stdout")
+    parser.add_argument("--top", type=int, default=5, help="Mismatched entries to list per term (0 = all)")
+
+    args = parser.parse_args()
+
+    config_manager.register_project(SILKSONG_CONFIG)
+    config = config_manager.get_project("silksong")
+    source_dir = Path(args.source or config.source_dir)
+    output_dir = Path(args.output or config.get_output_dir())
+
+    prefix = f"{config.source_lang}_"
+    sources = sorted(path for path in source_dir.glob(f"{prefix}*") if path.suffix in ('.txt', '.json'))
+    if not sources:
+        print(f"No {prefix}* files in {source_dir}")
+        return 1
+
+    started = time.perf_counter()
+    index, rebuilt = open_text_index(SilksongProcessor(config), sources, output_dir, Path(args.index))
+    stats = index.stats()
+    # Keep stdout clean for --json -
+    status = sys.stderr if args.json_path == "-" else sys.stdout
+    print(f"Text index: {stats['entries']} entries in {stats['files']} files, {stats['source_tokens']} "
+          f"source tokens, {stats['target_stems']} target stems; re-indexed {len(rebuilt)} file(s) "
+          f"in {time.perf_counter() - started:.2f}s", file=status)
+
+    if args.find:
+        started = time.perf_counter()
+        hits = index.search(args.find)
+        print(f"{len(hits)} entries match '{args.find}' ({(time.perf_counter() - started) * 1000:.1f} ms)")
+        for name, row in hits[:args.top or None]:
+            occurrence = index.occurrence(name, row)
+            print(f"  {name}  {occurrence.key}")
+            print(f"    EN: {occurrence.source}")
+            print(f"    UA: {occurrence.translation}")
+        return 0
+
+    glossary = load_final_glossary(Path(args.glossary))
+    if args.term:
+        glossary = {term: text for term, text in glossary.items() if term in args.term}
+    if not glossary:
+        print(f"No glossary terms to check in {args.glossary}")
+        return 1
+
+    started = time.perf_counter()
+    checks = index.check_terms(glossary)
+    seconds = time.perf_counter() - started
+    inconsistent = [check for check in checks if check.mismatches]
+    mismatches = sum(len(check.mismatches) for check in checks)
+
+    if args.json_path:
+        report = {"generated": time.strftime("%Y-%m-%dT%H:%M:%S"), "seconds": round(seconds, 4),
+                  "terms": [check.to_dict() for check in inconsistent]}
+        if args.json_path == "-":
+            json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+            print()
+            return 1 if inconsistent else 0
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"Checked {len(checks)} terms in {seconds * 1000:.1f} ms: {len(inconsistent)} inconsistent, "
+          f"{mismatches} entries without the glossary translation")
+    for check in sorted(inconsistent, key=lambda check: -len(check.mismatches)):
+        print(f"  {check.term} -> {check.expected}: {len(check.mismatches)} of {check.occurrences} entries"
+              + (f" ({check.untranslated} untranslated)" if check.untranslated else ""))
+        for occurrence in check.mismatches[:args.top or None]:
+            print(f"    {occurrence.file}  {occurrence.key}: {occurrence.translation}")
+    if args.json_path:
+        print(f"Report saved to: {args.json_path}")
+    return 1 if inconsistent else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -3,19 +3,24 @@
 Decrypt Silksong text files for translation
 """
 import sys
+import json
+import time
 import argparse
 from pathlib import Path
 
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.crypto import SilksongCrypto
+from src.crypto import SilksongCrypto, summarize_results
 
 
 def main():
     parser = argparse.ArgumentParser(description="Decrypt Silksong text files")
     parser.add_argument("source_folder", help="Path to encrypted Silksong Texts folder")
     parser.add_argument("--output", "-o", help="Output folder (default: source_folder_Decrypted)")
+    parser.add_argument("--jobs", "-j", type=int, default=1,
+                        help="Number of worker processes (0 = all CPU cores, default: 1)")
+    parser.add_argument("--report", help="Write per-file results as JSON to this path")
     
     args = parser.parse_args()
     
@@ -27,7 +32,17 @@ def main():
         return 1
     
     crypto = SilksongCrypto()
-    crypto.decrypt_folder(source_folder, output_folder)
+    started = time.perf_counter()
+    results = crypto.decrypt_folder(source_folder, output_folder, workers=args.jobs)
+    
+    summary = summarize_results(results, time.perf_counter() - started)
+    print(f"{summary['ok']} ok, {summary['skipped']} skipped, {summary['error']} errors "
+          f"({summary['bytes_in']} bytes in, {summary['seconds']:.2f}s, "
+          f"{summary['worker_seconds']:.2f}s in workers)")
+    
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({"summary": summary, "files": [r.to_dict() for r in results]}, f, indent=2)
     
     print("Decryption completed!")
     return 0
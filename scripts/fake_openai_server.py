@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Fake OpenAI-compatible chat completions server for offline throughput tests
+Echoes the last user message back after a configurable delay, optionally
+answering with 429/500 to exercise retries.
+
+    python scripts/fake_openai_server.py --port 8089 --latency 0.2 --rate-limit-rate 0.05
+    LOCAL_API_URL=http://localhost:8089/v1/chat/completions python -m scripts.step3_translate_game --provider local
+"""
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    """Minimal /v1/models and /v1/chat/completions implementation"""
+
+    server_version = "FakeOpenAI/1.0"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": "fake-model", "object": "model"}]})
+        elif self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.stats)
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+
+        with server.lock:
+            server.stats["requests"] += 1
+        roll = random.random()
+        if roll < server.rate_limit_rate:
+            with server.lock:
+                server.stats["429"] += 1
+            self._send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit"}},
+                            headers={"Retry-After": "0.1"})
+            return
+        if roll < server.rate_limit_rate + server.error_rate:
+            with server.lock:
+                server.stats["500"] += 1
+            self._send_json(500, {"error": {"message": "Internal server error"}})
+            return
+
+        time.sleep(server.latency)
+
+        messages = request.get("messages", [])
+        user_messages = [m.get("content", "") for m in messages if m.get("role") == "user"]
+        content = user_messages[-1] if user_messages else ""
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+        completion_tokens = len(content) // 4
+
+        with server.lock:
+            server.stats["ok"] += 1
+        self._send_json(200, {
+            "id": f"chatcmpl-fake-{server.stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        })
+
+
+def make_server(port: int = 0, latency: float = 0.0, error_rate: float = 0.0,
+                rate_limit_rate: float = 0.0, verbose: bool = False) -> ThreadingHTTPServer:
+    """Build (not start) a fake server; port 0 picks a free port"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), FakeOpenAIHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.error_rate = error_rate
+    server.rate_limit_rate = rate_limit_rate
+    server.verbose = verbose
+    server.lock = threading.Lock()
+    server.stats = {"requests": 0, "ok": 0, "429": 0, "500": 0}
+    return server
+
+
+def start_in_thread(**kwargs) -> ThreadingHTTPServer:
+    """Start a fake server on a background thread, returns it (call .shutdown() when done)"""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible server for offline benchmarks")
+    parser.add_argument("--port", type=int, default=8089, help="Port to listen on (default: 8089)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per successful response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share of requests answered with 429")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency, args.error_rate, args.rate_limit_rate, args.verbose)
+    print(f"Fake OpenAI server on http://127.0.0.1:{server.server_address[1]}/v1/chat/completions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(f"Served: {server.stats}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
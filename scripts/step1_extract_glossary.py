@@ -11,10 +11,14 @@ from pathlib import Path
 from src.config import SILKSONG_CONFIG
 from core.src.core.config import config_manager
 from core.src.pipeline.extractor import TermExtractor
+from src.corpus_index import DEFAULT_INDEX_PATH, open_index
 from src.processor import SilksongProcessor
 from core.src.providers.openai_provider import OpenAIProvider
 from core.src.providers.local_provider import LocalProvider
 from core.src.providers.deepseek_provider import DeepSeekProvider
+from src.metrics import metrics, InstrumentedProvider
+from src.term_miner import (DEFAULT_EXTRACT_BATCH_TOKENS, CandidateBatchProcessor, TermMiner,
+                            extraction_batches, load_known_terms, merge_extracted_terms)
 
 
 def main():
@@ -25,6 +29,26 @@ def main():
     parser.add_argument("--max-files", type=int, help="Maximum number of files to process (for testing)")
     parser.add_argument("--output", default=None,
                        help="Output file for extracted terms")
+    parser.add_argument("--metrics-report", default=f"./data/{SILKSONG_CONFIG.name}/reports/step1_metrics.json",
+                        help="JSON run report: stage/file timings, token counts, provider latency percentiles")
+    parser.add_argument("--prometheus", help="Also write the metrics in Prometheus text format to this file")
+
+    parser.add_argument("--unit-cache", default=f"./data/{SILKSONG_CONFIG.name}/cache/units",
+                        help="Cache of parsed source units keyed by encrypted asset hash")
+    parser.add_argument("--no-unit-cache", dest="unit_cache", action="store_const", const=None,
+                        help="Decrypt and parse every source asset on each run")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH,
+                        help="Prebuilt corpus index of sources and outputs, rebuilt when they change")
+    parser.add_argument("--no-index", dest="index", action="store_const", const=None,
+                        help="Parse every source file instead of using the corpus index")
+    parser.add_argument("--glossary-dir", default=f"./data/{SILKSONG_CONFIG.name}/glossaries",
+                        help="Folder with extracted_terms.json and final_glossary.json")
+    parser.add_argument("--no-mine", dest="mine", action="store_false",
+                        help="Send every file to the model instead of only entries with new candidate terms")
+    parser.add_argument("--all-terms", action="store_true",
+                        help="Also send entries whose candidates are already in the glossary")
+    parser.add_argument("--extract-batch-tokens", type=int, default=DEFAULT_EXTRACT_BATCH_TOKENS,
+                        help="Source tokens per extraction request when mining")
 
     args = parser.parse_args()
 
@@ -39,12 +63,55 @@ def main():
     elif args.provider == "deepseek":
         ai_provider = DeepSeekProvider(model_name=args.model)
 
+    ai_provider = InstrumentedProvider(ai_provider, name=f"{args.provider}:{args.model}")
+
     config_manager.register_project(SILKSONG_CONFIG)
-    processor = SilksongProcessor(SILKSONG_CONFIG)
-    extractor = TermExtractor(SILKSONG_CONFIG, processor, ai_provider)
+    processor = SilksongProcessor(SILKSONG_CONFIG, unit_cache_dir=args.unit_cache)
+    if args.index:
+        with metrics.span("corpus_index"):
+            processor.index = open_index(processor, processor.get_all_source_files(), Path(args.index),
+                                         SILKSONG_CONFIG.get_output_dir())
+
+    if not args.mine:
+        extractor = TermExtractor(SILKSONG_CONFIG, processor, ai_provider)
+        with metrics.span("step1.extract_all_terms"):
+            terms = extractor.extract_all_terms(max_files=args.max_files)
+    else:
+        glossary_dir = Path(args.glossary_dir)
+        extracted_path = glossary_dir / "extracted_terms.json"
+        previous = None
+        known = set()
+        if not args.all_terms:
+            known = load_known_terms(extracted_path, glossary_dir / "final_glossary.json")
+            if extracted_path.exists():
+                with open(extracted_path, 'r', encoding='utf-8') as f:
+                    previous = json.load(f)
+
+        # Local pre-pass: only entries with a candidate term not in the glossary go to the model
+        with metrics.span("step1.mine_terms"):
+            files = sorted(processor.get_all_source_files())[:args.max_files]
+            units_by_file = {path: processor.read_file(path) for path in files}
+            units = [unit for file_units in units_by_file.values() for unit in file_units]
+            mining = TermMiner(known).mine(units)
+            batches = extraction_batches(mining.selected, args.extract_batch_tokens)
+        print(f"Term miner: {mining.summary()}")
+        print(f"Extraction requests: {len(batches)} batches instead of {len(files)} files")
+        metrics.count("term_calls_avoided", max(0, len(files) - len(batches)))
+        metrics.count("term_entries_skipped", mining.total_units - len(mining.selected))
+        metrics.count("term_tokens_skipped", mining.skipped_tokens)
 
-    # Extract terms
-    terms = extractor.extract_all_terms(max_files=args.max_files)
+        stats = {"candidates": len(mining.candidates), "new_candidates": len(mining.new_terms),
+                 "entries_sent": len(mining.selected), "entries_total": mining.total_units,
+                 "tokens_skipped": mining.skipped_tokens, "batches": len(batches), "files": len(files)}
+        if batches:
+            extractor = TermExtractor(SILKSONG_CONFIG, CandidateBatchProcessor(processor, batches), ai_provider)
+            with metrics.span("step1.extract_all_terms"):
+                terms = extractor.extract_all_terms()
+        else:
+            print("No new candidate terms, nothing to send")
+            terms = {}
+        with metrics.span("step1.attribute_terms"):
+            terms = merge_extracted_terms(terms, previous, units_by_file, stats)
 
     # Use GlossaryManager to save
     from core.src.utils.glossary import GlossaryManager
@@ -54,6 +121,8 @@ def main():
     output_path = glossary_manager.save_extracted_terms(terms)
     print(f"Extracted {terms.get('total_unique_terms', 0)} unique terms")
     print(f"Saved to: {output_path}")
+    print(metrics.summary())
+    metrics.export(args.metrics_report, args.prometheus)
     return 0
 
 
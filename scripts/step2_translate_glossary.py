@@ -14,6 +14,10 @@ from core.src.utils.glossary import GlossaryManager
 from core.src.providers.openai_provider import OpenAIProvider
 from core.src.providers.local_provider import LocalProvider
 from core.src.providers.deepseek_provider import DeepSeekProvider
+from src.async_engine import PROVIDER_LIMITS, ProviderLimits
+from src.glossary_batches import (DEFAULT_GLOSSARY_BATCH_SIZE, GlossaryBatchTranslator, load_final_glossary,
+                                  pending_terms)
+from src.metrics import metrics, InstrumentedProvider
 
 
 def main():
@@ -21,7 +25,21 @@ def main():
     parser.add_argument("--provider", choices=["openai", "local", "deepseek"], default="openai",
                        help="AI provider to use")
     parser.add_argument("--model", default="gpt-4o", help="Model name to use")
-    parser.add_argument("--batch-size", type=int, default=20, help="Number of terms to translate at once")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_GLOSSARY_BATCH_SIZE,
+                        help="Number of terms to translate at once")
+    parser.add_argument("--max-concurrency", type=int,
+                        help="Maximum requests in flight (default depends on provider)")
+    parser.add_argument("--rpm", type=float, help="Requests per minute limit (default depends on provider)")
+    parser.add_argument("--tpm", type=float, help="Tokens per minute limit (default depends on provider)")
+    parser.add_argument("--max-retries", type=int, default=5,
+                        help="Retries with jittered backoff on 429/5xx/connection errors")
+    parser.add_argument("--glossary", default=f"./data/{SILKSONG_CONFIG.name}/glossaries/final_glossary.json",
+                        help="Final glossary to update; terms already translated there are not sent again")
+    parser.add_argument("--retranslate", action="store_true",
+                        help="Send every extracted term, replacing existing translations")
+    parser.add_argument("--metrics-report", default=f"./data/{SILKSONG_CONFIG.name}/reports/step2_metrics.json",
+                        help="JSON run report: stage/file timings, token counts, provider latency percentiles")
+    parser.add_argument("--prometheus", help="Also write the metrics in Prometheus text format to this file")
 
     args = parser.parse_args()
 
@@ -38,7 +56,14 @@ def main():
         print("No extracted terms found. Please run step1_extract_glossary.py first")
         return 1
 
-    print(f"Loaded {len(terms)} terms to translate")
+    glossary_path = Path(args.glossary)
+    glossary = load_final_glossary(glossary_path)
+    pending = list(dict.fromkeys(terms)) if args.retranslate else pending_terms(terms, glossary)
+    print(f"Loaded {len(terms)} terms, {len(pending)} to translate "
+          f"({len(terms) - len(pending)} already in {glossary_path.name})")
+    if not pending:
+        print("Glossary is up to date, nothing to translate")
+        return 0
 
     # Create AI provider
     if args.provider == "openai":
@@ -48,22 +73,31 @@ def main():
     elif args.provider == "deepseek":
         ai_provider = DeepSeekProvider(model_name=args.model)
 
-    # Translate terms using provider's glossary method
-    print("Translating all terms...")
-    translated_terms = ai_provider.translate_glossary(
-        terms,
-        source_lang=SILKSONG_CONFIG.source_lang,
-        target_lang="Ukrainian"
+    ai_provider = InstrumentedProvider(ai_provider, name=f"{args.provider}:{args.model}")
+
+    # Concurrency and rate limits: provider defaults, overridden by flags
+    defaults = PROVIDER_LIMITS.get(args.provider, ProviderLimits())
+    limits = ProviderLimits(
+        max_concurrency=args.max_concurrency or defaults.max_concurrency,
+        requests_per_minute=args.rpm or defaults.requests_per_minute,
+        tokens_per_minute=args.tpm or defaults.tokens_per_minute,
     )
 
-    # Save final glossary directly
-    final_file = glossary_manager.create_final_glossary(translated_terms)
+    # Translate in batches; each finished batch is merged into the glossary file at once
+    translator = GlossaryBatchTranslator(ai_provider, SILKSONG_CONFIG, glossary_path, batch_size=args.batch_size,
+                                         limits=limits, max_retries=args.max_retries)
+    print(f"Translating in batches of {translator.batch_size}, concurrency {limits.max_concurrency}...")
+    run = translator.translate(pending, glossary)
 
-    print(f"Translated {len(translated_terms)} terms")
-    print(f"Final glossary: {final_file}")
-    print("Glossary is ready for use in translation!")
+    print(f"Translated {len(run.translated)} of {len(pending)} terms in {run.batches} requests")
+    print(f"Final glossary: {glossary_path} ({len(glossary)} terms)")
+    if run.failed:
+        print(f"{len(run.failed)} terms without translation ({run.failed_batches} failed batches); "
+              f"run step2 again to retry only them")
+    print(metrics.summary())
+    metrics.export(args.metrics_report, args.prometheus)
 
-    return 0
+    return 1 if run.failed else 0
 
 
 if __name__ == "__main__":
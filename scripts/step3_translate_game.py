@@ -3,17 +3,25 @@
 Step 3: Translate game content using approved glossary
 """
 import sys
+import json
 import argparse
+from dataclasses import asdict
 from pathlib import Path
 
 # Imports
 from src.config import SILKSONG_CONFIG
 from core.src.core.config import config_manager
-from core.src.pipeline.translator import Translator
 from core.src.providers.openai_provider import OpenAIProvider
 from core.src.providers.local_provider import LocalProvider
 from core.src.providers.deepseek_provider import DeepSeekProvider
+from src.corpus_index import DEFAULT_INDEX_PATH, open_index
 from src.processor import SilksongProcessor
+from src.translation_memory import TranslationMemory, CachedProvider, DEFAULT_MAX_ENTRIES, glossary_version
+from src.journal import TranslationJournal
+from src.metrics import metrics, InstrumentedProvider
+from src.translator import SilksongTranslator
+from src.async_engine import ProviderLimits, PROVIDER_LIMITS
+from src.batching import DEFAULT_MAX_BATCH_ITEMS, DEFAULT_MAX_BATCH_TOKENS
 
 
 def main():
@@ -21,18 +29,63 @@ def main():
     parser.add_argument("--provider", choices=["openai", "local", "deepseek"], default="openai",
                        help="AI provider to use")
     parser.add_argument("--model", default="gpt-4o", help="Model name to use")
-    parser.add_argument("--batch-size", type=int, default=5, help="Translation batch size")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_MAX_BATCH_ITEMS,
+                        help="Maximum texts per request")
+    parser.add_argument("--batch-tokens", type=int, default=DEFAULT_MAX_BATCH_TOKENS,
+                        help="Maximum estimated source tokens per request")
     parser.add_argument("--max-files", type=int, help="Maximum number of files to process (for testing)")
     parser.add_argument("--parallel", action="store_true", default=True, help="Enable parallel processing")
     parser.add_argument("--no-parallel", dest="parallel", action="store_false", help="Disable parallel processing")
+    parser.add_argument("--max-concurrency", type=int,
+                        help="Maximum requests in flight (default depends on provider)")
+    parser.add_argument("--rpm", type=float, help="Requests per minute limit (default depends on provider)")
+    parser.add_argument("--tpm", type=float, help="Tokens per minute limit (default depends on provider)")
+    parser.add_argument("--max-retries", type=int, default=5,
+                        help="Retries with jittered backoff on 429/5xx/connection errors")
+    parser.add_argument("--no-cache", dest="cache", action="store_false",
+                        help="Disable the translation memory and always call the provider")
+    parser.add_argument("--cache-path", default=f"./data/{SILKSONG_CONFIG.name}/cache/translation_memory.sqlite",
+                        help="Translation memory database file")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_ENTRIES,
+                        help="Maximum cached translations before least recently used are evicted")
+    parser.add_argument("--resume", action="store_true",
+                        help="Replay the checkpoint journal of an interrupted run and continue from there")
+    parser.add_argument("--journal-path", default=f"./data/{SILKSONG_CONFIG.name}/cache/step3_journal.jsonl",
+                        help="Checkpoint journal file (one line per completed batch)")
+    parser.add_argument("--metrics-report", default=f"./data/{SILKSONG_CONFIG.name}/reports/step3_metrics.json",
+                        help="JSON run report: stage/file timings, token counts, provider latency percentiles")
+    parser.add_argument("--prometheus", help="Also write the metrics in Prometheus text format to this file")
+    parser.add_argument("--source", help="Decrypted EN_* folder to translate (default: project source dir)")
+    parser.add_argument("--previous-source",
+                        help="Decrypted EN_* folder of the previous game version; only added/changed "
+                             "entries are translated")
+    parser.add_argument("--previous-output",
+                        help="Translations of the previous version to carry over (default: output dir)")
+    parser.add_argument("--diff-report", help="Write the patch diff (added/changed/removed keys) as JSON")
+
+    parser.add_argument("--unit-cache", default=f"./data/{SILKSONG_CONFIG.name}/cache/units",
+                        help="Cache of parsed source units keyed by encrypted asset hash")
+    parser.add_argument("--no-unit-cache", dest="unit_cache", action="store_const", const=None,
+                        help="Decrypt and parse every source asset on each run")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH,
+                        help="Prebuilt corpus index of sources and outputs, rebuilt when they change")
+    parser.add_argument("--no-index", dest="index", action="store_const", const=None,
+                        help="Parse every source file instead of using the corpus index")
+    parser.add_argument("--markup-retries", type=int, default=2,
+                        help="Times a text with broken tags/placeholders/entities is re-sent on its own "
+                             "before it is left in the source language (default: 2)")
+    parser.add_argument("--markup-report",
+                        help="Write the translations that still fail markup validation as JSON")
 
     args = parser.parse_args()
 
     print("Translating Silksong game content")
     print(f"Provider: {args.provider}, Model: {args.model}")
-    print(f"Batch size: {args.batch_size}, Parallel: {args.parallel}")
+    print(f"Batch size: up to {args.batch_size} texts / {args.batch_tokens} tokens, Parallel: {args.parallel}")
 
     # Setup
+    if args.source:
+        SILKSONG_CONFIG.source_dir = args.source
     config_manager.register_project(SILKSONG_CONFIG)
     config_manager.ensure_project_dirs(SILKSONG_CONFIG.name)
 
@@ -47,21 +100,107 @@ def main():
     elif args.provider == "deepseek":
         ai_provider = DeepSeekProvider(model_name=args.model)
 
+    # Time every real provider call (cache hits below never reach it)
+    ai_provider = InstrumentedProvider(ai_provider, name=f"{args.provider}:{args.model}")
+
+    # Answer repeated strings from the translation memory before calling the provider
+    memory = None
+    if args.cache:
+        memory = TranslationMemory(Path(args.cache_path), max_entries=args.cache_size)
+        ai_provider = CachedProvider(ai_provider, memory, model_name=f"{args.provider}:{args.model}")
+        print(f"Translation memory: {args.cache_path} ({len(memory)} entries)")
+
+    # Concurrency and rate limits: provider defaults, overridden by flags
+    defaults = PROVIDER_LIMITS.get(args.provider, ProviderLimits())
+    limits = ProviderLimits(
+        max_concurrency=args.max_concurrency or defaults.max_concurrency,
+        requests_per_minute=args.rpm or defaults.requests_per_minute,
+        tokens_per_minute=args.tpm or defaults.tokens_per_minute,
+    )
+    print(f"Concurrency: {limits.max_concurrency}, RPM: {limits.requests_per_minute or '-'}, "
+          f"TPM: {limits.tokens_per_minute or '-'}")
+
     # Create processor and translator
-    processor = SilksongProcessor(SILKSONG_CONFIG)
-    translator = Translator(SILKSONG_CONFIG, processor, ai_provider, batch_size=args.batch_size)
+    processor = SilksongProcessor(SILKSONG_CONFIG, unit_cache_dir=args.unit_cache)
+    if args.index:
+        with metrics.span("corpus_index"):
+            processor.index = open_index(processor, processor.get_all_source_files(), Path(args.index),
+                                         SILKSONG_CONFIG.get_output_dir())
+    translator = SilksongTranslator(SILKSONG_CONFIG, processor, ai_provider, batch_size=args.batch_size,
+                                    limits=limits, max_retries=args.max_retries,
+                                    max_batch_tokens=args.batch_tokens, markup_retries=args.markup_retries)
 
     # Load glossary
     glossary = translator.load_glossary()
+    translator.glossary = glossary
     print(f"Loaded glossary with {len(glossary)} terms")
+    if memory is not None:
+        ai_provider.set_glossary(glossary)
+
+    # Checkpoint every completed batch so an interrupted run can --resume
+    journal = TranslationJournal(Path(args.journal_path))
+    replayed = journal.start({
+        "project": SILKSONG_CONFIG.name,
+        "target_lang": SILKSONG_CONFIG.target_lang,
+        "provider": f"{args.provider}:{args.model}",
+        "glossary_version": glossary_version(glossary),
+    }, resume=args.resume)
+    translator.journal = journal
+    if args.resume:
+        print(f"Journal: {args.journal_path} ({replayed} completed batches, {len(journal)} texts)")
 
     # Translate files
     print(f"Using {'parallel' if args.parallel else 'sequential'} translation...")
-    results = translator.translate_all_files(max_files=args.max_files, parallel=args.parallel)
+    try:
+        with metrics.span("step3.translate"):
+            if args.previous_source:
+                print(f"Patch mode against: {args.previous_source}")
+                results = translator.translate_patch(Path(args.previous_source), args.previous_output,
+                                                     max_files=args.max_files, parallel=args.parallel)
+                if args.diff_report:
+                    translator.patch_diff.save(Path(args.diff_report))
+                    print(f"Patch diff saved to: {args.diff_report}")
+            else:
+                results = translator.translate_all_files(max_files=args.max_files, parallel=args.parallel)
+    except KeyboardInterrupt:
+        print(f"Interrupted; {journal.batches} batches are journaled, rerun with --resume to continue")
+        metrics.export(args.metrics_report, args.prometheus)
+        return 130
+    finally:
+        journal.close()
 
     print("Translation completed!")
+    print(f"Unique texts sent: {results['unique_texts']} of {results['units']} units "
+          f"(dedup ratio {results['dedup_ratio']:.1%}), failed batches: {results['failed_batches']}")
+    if results['resumed_texts']:
+        print(f"Resumed from journal: {results['resumed_texts']} texts not re-requested")
+    if results['cached_texts']:
+        print(f"From translation memory: {results['cached_texts']} texts not re-requested")
+    print(f"Requests: {results['requests']}, retries: {results['retries']}, time: {results['seconds']:.1f}s")
+    print(f"Glossary terms per request: {results['glossary_terms_per_request']:.1f} of {len(glossary)}")
+    if results['markup_invalid']:
+        print(f"Markup: {results['markup_invalid']} invalid translations, {results['markup_fixed']} fixed "
+              f"by re-queue, {results['markup_reverted']} left in the source language")
+    if args.markup_report:
+        with open(args.markup_report, 'w', encoding='utf-8') as f:
+            json.dump([asdict(issue) for issue in translator.markup_issues], f, indent=2, ensure_ascii=False)
+        print(f"Markup issues saved to: {args.markup_report}")
+    if args.previous_source:
+        print(f"Patch: {results['added']} added, {results['changed']} changed, "
+              f"{results['removed']} removed, {results['carried_over']} translations carried over")
     print(f"Translated files saved to: {SILKSONG_CONFIG.get_output_dir()}")
+    print(f"Files written: {processor.write_stats['written']}, "
+          f"unchanged: {processor.write_stats['skipped']}")
+
+    if memory is not None:
+        stats = memory.stats()
+        print(f"Translation memory: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.1%} hit rate), {stats['entries']} entries")
+        metrics.cache("translation_memory", stats['hits'], stats['misses'])
+        memory.close()
 
+    print(metrics.summary())
+    metrics.export(args.metrics_report, args.prometheus)
     return 0
 
 
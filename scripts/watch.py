@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Watch translated files and re-encrypt each one into the game folder as soon as it is saved
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.config import SILKSONG_CONFIG
+from src.processor import SilksongProcessor
+from src.watch import DEFAULT_DEBOUNCE, RebuildResult, watch_folder
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot-rebuild edited localization files into the game folder")
+    parser.add_argument("output_folder",
+                        help='Where encrypted .json files go, e.g. "Hollow Knight Silksong_Data/Texts"')
+    parser.add_argument("--source", default=SILKSONG_CONFIG.get_output_dir(),
+                        help="Folder with translated .txt files (default: project output dir)")
+    parser.add_argument("--pattern", default=f"{SILKSONG_CONFIG.target_lang_code}_*.txt",
+                        help="Files to watch (default: DE_*.txt)")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE * 1000,
+                        help="Milliseconds without further saves before rebuilding (default: 50)")
+    parser.add_argument("--poll", action="store_true", help="Poll modification times instead of inotify")
+
+    args = parser.parse_args()
+
+    source_folder = Path(args.source)
+    if not source_folder.exists():
+        print(f"Error: Source folder not found: {source_folder}")
+        return 1
+
+    processor = SilksongProcessor(SILKSONG_CONFIG)
+
+    def report(result: RebuildResult):
+        stamp = time.strftime("%H:%M:%S")
+        if result.ok:
+            print(f"[{stamp}] {result.file}: {result.units} entries -> "
+                  f"{Path(args.output_folder) / (Path(result.file).stem + '.json')} "
+                  f"({result.seconds * 1000:.0f} ms)")
+        else:
+            print(f"[{stamp}] {result.file}: NOT rebuilt, {result.message}")
+
+    print(f"Watching {source_folder / args.pattern} -> {args.output_folder} (Ctrl-C to stop)")
+    try:
+        watch_folder(source_folder, Path(args.output_folder), processor, pattern=args.pattern,
+                     debounce=args.debounce / 1000, polling=args.poll, on_result=report)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,147 @@
+"""
+Asyncio execution engine for provider calls
+Bounded concurrency, per-provider token buckets and jittered retries on 429/5xx
+"""
+import time
+import random
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+@dataclass
+class ProviderLimits:
+    """Request/token per-minute budget and in-flight limit for one provider"""
+    max_concurrency: int = 4
+    requests_per_minute: Optional[float] = None
+    tokens_per_minute: Optional[float] = None
+
+
+# Conservative defaults; override with --max-concurrency/--rpm/--tpm
+PROVIDER_LIMITS: Dict[str, ProviderLimits] = {
+    "openai": ProviderLimits(max_concurrency=8, requests_per_minute=500, tokens_per_minute=200_000),
+    "deepseek": ProviderLimits(max_concurrency=4, requests_per_minute=60),
+    # A single LM Studio/Ollama instance serves one or two requests efficiently
+    "local": ProviderLimits(max_concurrency=2),
+}
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at per_minute / 60 per second"""
+
+    def __init__(self, per_minute: float, burst: float = None):
+        self.rate = per_minute / 60.0
+        # Default burst of ~6 seconds worth keeps us from tripping sliding-window limits
+        self.capacity = burst or max(1.0, per_minute / 10)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount: float = 1.0) -> None:
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+def status_of(error: Exception) -> Optional[int]:
+    """HTTP status from openai/requests/urllib style exceptions, if any"""
+    for attr in ("status_code", "status", "code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return value if isinstance(value, int) else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """429/5xx and transport errors are worth retrying, everything else is not"""
+    status = status_of(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # OSError covers socket/urllib/requests transport failures
+    name = type(error).__name__.lower()
+    return isinstance(error, OSError) or "timeout" in name or "connection" in name
+
+
+class AsyncBatchRunner:
+    """Run blocking (or async) provider calls concurrently under rate limits"""
+
+    def __init__(self, limits: ProviderLimits = None, max_retries: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+        self.limits = limits or ProviderLimits()
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "seconds": 0.0}
+
+    def run(self, jobs: List[Any], call: Callable[[Any], Any],
+            cost: Callable[[Any], float] = None,
+            on_result: Callable[[int, Any], None] = None) -> List[Any]:
+        """Call call(job) for every job; returns results in job order, exceptions in place of failures
+
+        on_result(index, result) is called from the event loop as each job finishes,
+        so callers can persist partial progress without waiting for the slowest job.
+        """
+        started = time.perf_counter()
+        try:
+            return asyncio.run(self._run_all(jobs, call, cost, on_result))
+        finally:
+            self.stats["seconds"] += time.perf_counter() - started
+
+    async def _run_all(self, jobs, call, cost, on_result=None):
+        limits = self.limits
+        semaphore = asyncio.Semaphore(max(1, limits.max_concurrency))
+        request_bucket = TokenBucket(limits.requests_per_minute) if limits.requests_per_minute else None
+        token_bucket = TokenBucket(limits.tokens_per_minute) if limits.tokens_per_minute else None
+
+        with ThreadPoolExecutor(max_workers=max(1, limits.max_concurrency)) as pool:
+            async def run_one(job):
+                async with semaphore:
+                    for attempt in range(self.max_retries + 1):
+                        if request_bucket:
+                            await request_bucket.acquire(1)
+                        if token_bucket and cost:
+                            await token_bucket.acquire(cost(job))
+
+                        self.stats["requests"] += 1
+                        try:
+                            if asyncio.iscoroutinefunction(call):
+                                return await call(job)
+                            return await asyncio.get_running_loop().run_in_executor(pool, call, job)
+                        except Exception as e:
+                            if attempt == self.max_retries or not is_retryable(e):
+                                self.stats["failures"] += 1
+                                return e
+                            self.stats["retries"] += 1
+                            await asyncio.sleep(self._backoff(attempt, e))
+
+            async def run_indexed(index, job):
+                result = await run_one(job)
+                if on_result:
+                    on_result(index, result)
+                return result
+
+            return await asyncio.gather(*(run_indexed(index, job) for index, job in enumerate(jobs)))
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Full-jitter exponential backoff, honouring Retry-After when the error carries one"""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+        try:
+            retry_after = float(headers.get("retry-after") or headers.get("Retry-After"))
+        except (TypeError, ValueError, AttributeError):
+            retry_after = None
+        if retry_after is not None:
+            return min(self.max_delay, retry_after) + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
@@ -0,0 +1,84 @@
+"""
+Token-aware request batching
+Packs unique source texts into requests by estimated token count instead of a fixed item count
+"""
+from dataclasses import dataclass
+from itertools import groupby
+from typing import List, Tuple
+
+from core.src.core.models import TranslationUnit
+from src.tokens import estimate_tokens
+
+DEFAULT_MAX_BATCH_TOKENS = 1500
+DEFAULT_MAX_BATCH_ITEMS = 40
+
+Group = List[TranslationUnit]
+
+
+def conversation_of(unit: TranslationUnit) -> Tuple[str, str]:
+    """(source file, speaker/topic) for a unit; keys look like DOCTOR_CURSE_OFFER, PINSMITH_QUEST_ACCEPT"""
+    return unit.metadata.get('source_file', ''), unit.key.split('_', 1)[0]
+
+
+@dataclass
+class BatchPlan:
+    """Packed batches plus the numbers worth logging"""
+    batches: List[List[Group]]
+    tokens: List[int]
+
+    @property
+    def average_tokens(self) -> float:
+        return sum(self.tokens) / len(self.tokens) if self.tokens else 0.0
+
+    def summary(self) -> str:
+        if not self.batches:
+            return "0 requests"
+        items = sum(len(batch) for batch in self.batches)
+        return (f"{len(self.batches)} requests, {items / len(self.batches):.1f} texts and "
+                f"{self.average_tokens:.0f} prompt tokens per request (max {max(self.tokens)})")
+
+
+def pack_batches(groups: List[Group], max_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+                 max_items: int = DEFAULT_MAX_BATCH_ITEMS) -> BatchPlan:
+    """Greedily fill requests up to max_tokens/max_items, keeping conversations together
+
+    Groups are clustered by (file, conversation) first. A conversation that would
+    fit in a fresh request but not in the current (at least half full) one starts
+    a new request instead of being split across two.
+    """
+    # Stable sort: file order and in-file order are preserved inside each cluster
+    order = {}
+    for group in groups:
+        order.setdefault(conversation_of(group[0]), len(order))
+    clustered = sorted(groups, key=lambda group: order[conversation_of(group[0])])
+
+    batches: List[List[Group]] = []
+    tokens: List[int] = []
+    current: List[Group] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            batches.append(current)
+            tokens.append(current_tokens)
+        current, current_tokens = [], 0
+
+    for _, run in groupby(clustered, key=lambda group: conversation_of(group[0])):
+        run = [(group, estimate_tokens(group[0].original_text)) for group in run]
+        run_tokens = sum(cost for _, cost in run)
+
+        # Move the whole conversation to a fresh request rather than splitting it,
+        # unless the current request is still mostly empty
+        if (current_tokens >= max_tokens // 2 and run_tokens <= max_tokens and len(run) <= max_items and
+                (current_tokens + run_tokens > max_tokens or len(current) + len(run) > max_items)):
+            flush()
+
+        for group, cost in run:
+            if current and (current_tokens + cost > max_tokens or len(current) >= max_items):
+                flush()
+            current.append(group)
+            current_tokens += cost
+
+    flush()
+    return BatchPlan(batches, tokens)
@@ -11,5 +11,6 @@ SILKSONG_CONFIG = ProjectConfig(
     name="silksong",
     source_lang="EN",
     target_lang_code="DE",  # Replace German with Ukrainian
-    source_dir="./data/silksong/source/SILKSONG_EN/._Decrypted"
+    # Encrypted EN_*.json game assets, decrypted in memory by SilksongProcessor
+    source_dir="./data/silksong/source/SILKSONG_EN"
 )
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Columnar in-memory corpus: one row per entry, no per-entry objects or metadata dicts
+TranslationUnit objects are only built when a caller asks for them
+"""
+import sys
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from core.src.core.models import LineTranslationUnit
+
+FileRef = Union[str, Path]
+
+
+class Corpus:
+    """Entries of many files stored column-wise
+
+    Rows of one file are contiguous. Keys and file names are interned, so
+    two game versions or language variants loaded side by side share them.
+    Lookups by (file, key) go through a per-file dict of row numbers.
+    """
+
+    __slots__ = ("file_ids", "keys", "sources", "translations", "_files", "_file_index", "_ranges", "_key_index")
+
+    def __init__(self):
+        self.file_ids = array('I')
+        self.keys: List[str] = []
+        self.sources: List[str] = []
+        self.translations: List[Optional[str]] = []
+        self._files: List[str] = []
+        self._file_index: Dict[str, int] = {}
+        self._ranges: List[Tuple[int, int]] = []
+        self._key_index: List[Dict[str, int]] = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, file: FileRef) -> bool:
+        return str(file) in self._file_index
+
+    @property
+    def files(self) -> List[str]:
+        return list(self._files)
+
+    def add_file(self, file: FileRef, entries: Iterable[Tuple[str, str]]) -> int:
+        """Append the (key, source text) pairs of one file; returns its file id"""
+        name = sys.intern(str(file))
+        if name in self._file_index:
+            raise ValueError(f"{name} is already in the corpus")
+        file_id = len(self._files)
+        start = len(self.keys)
+        index: Dict[str, int] = {}
+        for key, text in entries:
+            key = sys.intern(key)
+            index[key] = len(self.keys)
+            self.keys.append(key)
+            self.sources.append(text)
+        count = len(self.keys) - start
+        self.file_ids.extend([file_id] * count)
+        self.translations.extend([None] * count)
+        self._files.append(name)
+        self._file_index[name] = file_id
+        self._ranges.append((start, len(self.keys)))
+        self._key_index.append(index)
+        return file_id
+
+    def file_id(self, file: FileRef) -> int:
+        return self._file_index[str(file)]
+
+    def file_of(self, row: int) -> str:
+        return self._files[self.file_ids[row]]
+
+    def rows(self, file: FileRef) -> range:
+        return range(*self._ranges[self.file_id(file)])
+
+    def find(self, file: FileRef, key: str) -> Optional[int]:
+        """Row of key in file, or None"""
+        return self._key_index[self.file_id(file)].get(key)
+
+    def source(self, file: FileRef, key: str) -> Optional[str]:
+        row = self.find(file, key)
+        return None if row is None else self.sources[row]
+
+    def translation(self, file: FileRef, key: str) -> Optional[str]:
+        row = self.find(file, key)
+        return None if row is None else self.translations[row]
+
+    def set_translations(self, file: FileRef, entries: Iterable[Tuple[str, str]]) -> int:
+        """Fill the translation column of file from (key, text) pairs; returns how many keys matched"""
+        index = self._key_index[self.file_id(file)]
+        matched = 0
+        for key, text in entries:
+            row = index.get(key)
+            if row is not None:
+                self.translations[row] = text
+                matched += 1
+        return matched
+
+    def entries(self, file: FileRef) -> Iterator[Tuple[str, str, Optional[str]]]:
+        """(key, source, translation) for every entry of file, in file order"""
+        start, stop = self._ranges[self.file_id(file)]
+        return zip(self.keys[start:stop], self.sources[start:stop], self.translations[start:stop])
+
+    def unit(self, row: int) -> LineTranslationUnit:
+        """Materialize one row as the unit SilksongProcessor.read_file would return"""
+        key = self.keys[row]
+        return LineTranslationUnit(
+            key=key,
+            original_text=self.sources[row],
+            translated_text=self.translations[row],
+            metadata={'source_file': self.file_of(row), 'entry_name': key}
+        )
+
+    def units(self, file: FileRef) -> List[LineTranslationUnit]:
+        return [self.unit(row) for row in self.rows(file)]
@@ -0,0 +1,370 @@
+"""
+Prebuilt memory-mapped corpus index
+Every parsed file (keys, source and translated text) in one binary file: mmap it and read entries without parsing
+"""
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import tempfile
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from core.src.core.models import LineTranslationUnit
+from src.corpus import Corpus
+from src.manifest import file_sha256
+
+INDEX_MAGIC = b'SSCI'
+# Bump when the layout or the parsing behind it changes
+INDEX_VERSION = 1
+DEFAULT_INDEX_PATH = "./data/silksong/cache/corpus.idx"
+
+# magic, version, byte order, file table (offset, length), entries (offset, count),
+# hash slots (hashes offset, rows offset, capacity), blob offset
+_HEADER = struct.Struct('<4sII QQ QQ QQQ Q')
+_ALIGN = 8
+# key offset, key length, text offset, text length, translation offset, translation length
+_ROW_FIELDS = 6
+_NO_TEXT = 0xFFFFFFFF
+
+FileRef = Union[str, Path]
+
+
+def _abspath(file: FileRef) -> str:
+    return os.path.abspath(str(file))
+
+
+def _slot_hash(file_id: int, key: bytes) -> int:
+    # 0 marks an empty slot
+    return int.from_bytes(hashlib.blake2b(file_id.to_bytes(4, 'little') + key, digest_size=8).digest(),
+                          'little') or 1
+
+
+def _file_state(path: str) -> Dict[str, object]:
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_sha256(Path(path))}
+
+
+def _pad(data: bytearray) -> None:
+    data.extend(b'\0' * (-len(data) % _ALIGN))
+
+
+def build_index(processor, files: Iterable[Path], index_path: Path,
+                translations_dir: Path = None) -> "CorpusIndex":
+    """Parse files (and their outputs in translations_dir) once and write them to index_path
+
+    Output files are stored as files of their own and also referenced from
+    the translation column of their source rows, without copying the text.
+    """
+    files = [Path(path) for path in files]
+    records: List[Dict[str, object]] = []
+    rows: List[Tuple[bytes, bytes, Optional[int]]] = []  # key, text, row of the translation
+
+    def add(path: Path, output_of: Optional[int] = None) -> Dict[str, int]:
+        start = len(rows)
+        keys: Dict[str, int] = {}
+        for key, text in processor.iter_entries(path, use_index=False):
+            keys[key] = len(rows)
+            rows.append((key.encode('utf-8'), text.encode('utf-8'), None))
+        record = {"path": _abspath(path), "start": start, "count": len(rows) - start, **_file_state(str(path))}
+        if output_of is not None:
+            record["output_of"] = output_of
+        records.append(record)
+        return keys
+
+    for path in files:
+        file_id = len(records)
+        source_keys = add(path)
+        if translations_dir is None:
+            continue
+        output = Path(translations_dir) / processor.get_output_filename(path.name)
+        if output.exists():
+            records[file_id]["output"] = len(records)
+            output_keys = add(output, output_of=file_id)
+            for key, row in source_keys.items():
+                target = output_keys.get(key)
+                if target is not None:
+                    rows[row] = (rows[row][0], rows[row][1], target)
+
+    # String blob with identical keys/texts stored once
+    blob = bytearray()
+    offsets: Dict[bytes, int] = {}
+
+    def place(value: bytes) -> int:
+        offset = offsets.get(value)
+        if offset is None:
+            offset = offsets[value] = len(blob)
+            blob.extend(value)
+        return offset
+
+    table = array('I')
+    for key, text, target in rows:
+        table.extend((place(key), len(key), place(text), len(text)))
+        if target is None:
+            table.extend((0, _NO_TEXT))
+        else:
+            translation = rows[target][1]
+            table.extend((place(translation), len(translation)))
+
+    # Open addressing over (file id, key); capacity is a power of two at least twice the rows
+    capacity = 1
+    while capacity < 2 * max(1, len(rows)):
+        capacity *= 2
+    slot_hashes = array('Q', bytes(8 * capacity))
+    slot_rows = array('I', bytes(4 * capacity))
+    for file_id, record in enumerate(records):
+        for row in range(record["start"], record["start"] + record["count"]):
+            value = _slot_hash(file_id, rows[row][0])
+            slot = value & (capacity - 1)
+            while slot_hashes[slot]:
+                slot = (slot + 1) & (capacity - 1)
+            slot_hashes[slot] = value
+            slot_rows[slot] = row
+
+    file_table = json.dumps({"version": INDEX_VERSION, "files": records}, ensure_ascii=False).encode('utf-8')
+    data = bytearray(b'\0' * _HEADER.size)
+    _pad(data)
+    files_offset = len(data)
+    data.extend(file_table)
+    _pad(data)
+    entries_offset = len(data)
+    data.extend(table.tobytes())
+    _pad(data)
+    hashes_offset = len(data)
+    data.extend(slot_hashes.tobytes())
+    rows_offset = len(data)
+    data.extend(slot_rows.tobytes())
+    _pad(data)
+    blob_offset = len(data)
+    data.extend(blob)
+    _HEADER.pack_into(data, 0, INDEX_MAGIC, INDEX_VERSION, 1 if sys.byteorder == 'little' else 2,
+                      files_offset, len(file_table), entries_offset, len(rows),
+                      hashes_offset, rows_offset, capacity, blob_offset)
+
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=index_path.parent, prefix=f".{index_path.name}.", suffix=".tmp")
+    try:
+        with open(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp creates 0600 files
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, index_path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    return CorpusIndex(index_path)
+
+
+class CorpusIndex:
+    """Read-only view of an index written by build_index
+
+    Same read API as Corpus (rows, find, entries, unit, units); strings are
+    decoded straight from the mapped file on access.
+    """
+
+    def __init__(self, index_path: Path):
+        self.path = Path(index_path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._open()
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def _open(self) -> None:
+        if len(self._mmap) < _HEADER.size:
+            raise ValueError(f"{self.path} is not a corpus index")
+        (magic, version, byte_order, files_offset, files_length, entries_offset, count,
+         hashes_offset, rows_offset, capacity, blob_offset) = _HEADER.unpack_from(self._mmap, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"{self.path} is not a version {INDEX_VERSION} corpus index")
+        if byte_order != (1 if sys.byteorder == 'little' else 2):
+            raise ValueError(f"{self.path} was built on a machine with a different byte order")
+        if blob_offset > len(self._mmap):
+            raise ValueError(f"{self.path} is truncated")
+
+        view = memoryview(self._mmap)
+        self._view = view
+        self.records = json.loads(bytes(view[files_offset:files_offset + files_length]))["files"]
+        self._table = view[entries_offset:entries_offset + count * _ROW_FIELDS * 4].cast('I')
+        self._hashes = view[hashes_offset:hashes_offset + capacity * 8].cast('Q')
+        self._slot_rows = view[rows_offset:rows_offset + capacity * 4].cast('I')
+        self._mask = capacity - 1
+        self._blob_offset = blob_offset
+        self._count = count
+        self._file_index: Dict[str, int] = {record["path"]: file_id for file_id, record in enumerate(self.records)}
+        self._names = [sys.intern(record["path"]) for record in self.records]
+        self._starts = [record["start"] for record in self.records]
+
+    def close(self) -> None:
+        for view in (self._table, self._hashes, self._slot_rows, self._view):
+            view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, file: FileRef) -> bool:
+        return _abspath(file) in self._file_index
+
+    @property
+    def files(self) -> List[str]:
+        return [record["path"] for record in self.records]
+
+    def lookup_file(self, file: FileRef) -> Optional[int]:
+        return self._file_index.get(_abspath(file))
+
+    def file_id(self, file: FileRef) -> int:
+        return self._file_index[_abspath(file)]
+
+    def drop_file(self, file: FileRef) -> None:
+        """Stop serving file (it was rewritten during this run)"""
+        self._file_index.pop(_abspath(file), None)
+
+    def rows(self, file: FileRef) -> range:
+        record = self.records[self.file_id(file)]
+        return range(record["start"], record["start"] + record["count"])
+
+    def _text(self, offset: int, length: int) -> str:
+        start = self._blob_offset + offset
+        return str(self._view[start:start + length], 'utf-8')
+
+    def key(self, row: int) -> str:
+        base = row * _ROW_FIELDS
+        return self._text(self._table[base], self._table[base + 1])
+
+    def source(self, row: int) -> str:
+        base = row * _ROW_FIELDS
+        return self._text(self._table[base + 2], self._table[base + 3])
+
+    def translation(self, row: int) -> Optional[str]:
+        base = row * _ROW_FIELDS
+        length = self._table[base + 5]
+        return None if length == _NO_TEXT else self._text(self._table[base + 4], length)
+
+    def find(self, file: FileRef, key: str) -> Optional[int]:
+        """Row of key in file via the hash table, or None"""
+        file_id = self.lookup_file(file)
+        if file_id is None:
+            return None
+        encoded = key.encode('utf-8')
+        value = _slot_hash(file_id, encoded)
+        record = self.records[file_id]
+        slot = value & self._mask
+        while self._hashes[slot]:
+            if self._hashes[slot] == value:
+                row = self._slot_rows[slot]
+                base = row * _ROW_FIELDS
+                start = self._blob_offset + self._table[base]
+                if (record["start"] <= row < record["start"] + record["count"] and
+                        self._view[start:start + self._table[base + 1]] == encoded):
+                    return row
+            slot = (slot + 1) & self._mask
+        return None
+
+    def entries(self, file: FileRef) -> Iterator[Tuple[str, str, Optional[str]]]:
+        """(key, source, translation) for every entry of file, in file order"""
+        rows = self.rows(file)
+        fields = self._table[rows.start * _ROW_FIELDS:rows.stop * _ROW_FIELDS].tolist()
+        view, blob = self._view, self._blob_offset
+        for base in range(0, len(fields), _ROW_FIELDS):
+            key_at, key_length, text_at, text_length, translation_at, translation_length = fields[base:base + 6]
+            key_at += blob
+            text_at += blob
+            translation = None
+            if translation_length != _NO_TEXT:
+                translation_at += blob
+                translation = str(view[translation_at:translation_at + translation_length], 'utf-8')
+            yield (str(view[key_at:key_at + key_length], 'utf-8'),
+                   str(view[text_at:text_at + text_length], 'utf-8'), translation)
+
+    def unit(self, row: int) -> LineTranslationUnit:
+        """Materialize one row as the unit SilksongProcessor.read_file would return"""
+        file_id = bisect_right(self._starts, row) - 1
+        key = self.key(row)
+        return LineTranslationUnit(key=key, original_text=self.source(row), translated_text=self.translation(row),
+                                   metadata={'source_file': self._names[file_id], 'entry_name': key})
+
+    def units(self, file: FileRef) -> List[LineTranslationUnit]:
+        name = self._names[self.file_id(file)]
+        return [LineTranslationUnit(key=key, original_text=source, translated_text=translation,
+                                    metadata={'source_file': name, 'entry_name': key})
+                for key, source, translation in self.entries(file)]
+
+    def to_corpus(self, files: Iterable[FileRef] = None) -> Corpus:
+        """Copy files (default: every file that is not an output) into a mutable Corpus"""
+        if files is None:
+            files = [record["path"] for record in self.records if "output_of" not in record]
+        corpus = Corpus()
+        for file in files:
+            rows = list(self.entries(file))
+            corpus.add_file(file, ((key, source) for key, source, _ in rows))
+            corpus.set_translations(file, ((key, translation) for key, _, translation in rows
+                                           if translation is not None))
+        return corpus
+
+    def stale_files(self) -> List[str]:
+        """Indexed files that changed on disk: size/mtime first, sha256 only when those differ"""
+        stale = []
+        for record in self.records:
+            try:
+                stat = os.stat(record["path"])
+            except OSError:
+                stale.append(record["path"])
+                continue
+            if stat.st_size == record["size"] and stat.st_mtime_ns == record["mtime_ns"]:
+                continue
+            if stat.st_size != record["size"] or file_sha256(Path(record["path"])) != record["sha256"]:
+                stale.append(record["path"])
+        return stale
+
+    def covers(self, processor, files: Iterable[Path], translations_dir: Path = None) -> bool:
+        """True if the index holds exactly these sources and their current outputs"""
+        expected = set()
+        for path in files:
+            expected.add(_abspath(path))
+            if translations_dir is not None:
+                output = Path(translations_dir) / processor.get_output_filename(Path(path).name)
+                if output.exists():
+                    expected.add(_abspath(output))
+        return expected == set(self._file_index)
+
+
+def open_index(processor, files: Iterable[Path], index_path: Path,
+               translations_dir: Path = None) -> CorpusIndex:
+    """Open index_path, rebuilding it first if it is missing, outdated or for a different file set"""
+    files = sorted(Path(path) for path in files)
+    reason = None
+    try:
+        index = CorpusIndex(index_path)
+    except FileNotFoundError:
+        index, reason = None, "not built yet"
+    except ValueError as e:
+        index, reason = None, str(e)
+
+    if index is not None:
+        stale = index.stale_files()
+        if stale:
+            reason = f"{len(stale)} changed file(s), e.g. {Path(stale[0]).name}"
+        elif not index.covers(processor, files, translations_dir):
+            reason = "different set of files"
+        if reason:
+            index.close()
+            index = None
+
+    if index is None:
+        print(f"Corpus index: rebuilding {index_path} ({reason})")
+        index = build_index(processor, files, index_path, translations_dir)
+    return index
@@ -0,0 +1,158 @@
+"""
+Translation coverage of the DE_* outputs against the EN_* sources
+Entries are read through SilksongProcessor.iter_entries, no TranslationUnit objects
+"""
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.processor import SilksongProcessor
+
+_word = re.compile(r'\w+')
+
+# Created by the pool initializer, once per worker process
+_worker_processor: Optional[SilksongProcessor] = None
+
+
+def is_technical(text: str) -> bool:
+    """Short, numeric or path-like text that is expected to stay untranslated"""
+    return (len(text) <= 2 or
+            text.startswith(("debug", "config", "path", "data")) or
+            text.endswith((".json", ".txt", ".dat")) or
+            text.isdigit())
+
+
+@dataclass
+class FileCoverage:
+    """Coverage numbers for one source file and its translated output"""
+    file: str
+    output: str
+    output_exists: bool = False
+    units: int = 0
+    empty: int = 0
+    technical: int = 0
+    translated: int = 0
+    untranslated: List[str] = field(default_factory=list)  # missing or empty in the output
+    identical: List[str] = field(default_factory=list)  # output equals source
+    orphaned: List[str] = field(default_factory=list)  # in the output but not in the source
+    source_chars: int = 0
+    source_words: int = 0
+    target_chars: int = 0
+    target_words: int = 0
+
+    @property
+    def translatable(self) -> int:
+        return self.units - self.empty - self.technical
+
+    @property
+    def coverage(self) -> float:
+        return self.translated / self.translatable if self.translatable else 1.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["translatable"] = self.translatable
+        data["coverage"] = round(self.coverage, 4)
+        return data
+
+
+def analyze_pair(source_path: Path, output_path: Path, processor: SilksongProcessor) -> FileCoverage:
+    """Compare one EN_* file with its DE_* output entry by entry"""
+    result = FileCoverage(file=Path(source_path).name, output=Path(output_path).name)
+    source = dict(processor.iter_entries(source_path))
+    result.output_exists = Path(output_path).exists()
+    target = dict(processor.iter_entries(output_path)) if result.output_exists else {}
+
+    _tally(result, source.items(), target.get)
+    result.orphaned = [key for key in target if key not in source]
+    return result
+
+
+def _tally(result: FileCoverage, source: Iterable[Tuple[str, str]],
+           translation_of: Callable[[str], Optional[str]]) -> None:
+    """Count the (key, text) source entries of one file into result"""
+    for key, text in source:
+        result.units += 1
+        stripped = text.strip()
+        if not stripped:
+            result.empty += 1
+            continue
+        result.source_chars += len(stripped)
+        result.source_words += len(_word.findall(stripped))
+        if is_technical(stripped):
+            result.technical += 1
+            continue
+
+        translation = (translation_of(key) or '').strip()
+        if not translation:
+            result.untranslated.append(key)
+            continue
+        result.target_chars += len(translation)
+        result.target_words += len(_word.findall(translation))
+        if translation == stripped:
+            result.identical.append(key)
+        else:
+            result.translated += 1
+
+
+def analyze_corpus_pairs(processor: SilksongProcessor, pairs: List[Tuple[Path, Path]]) -> List[FileCoverage]:
+    """analyze_pair over all pairs from one Corpus loaded by processor.read_corpus
+
+    Outputs are added as files of their own, so orphaned keys stay visible.
+    """
+    corpus = processor.read_corpus(source for source, _ in pairs)
+    processor.read_corpus((output for _, output in pairs if Path(output).exists()), corpus=corpus)
+    results = []
+    for source, output in pairs:
+        result = FileCoverage(file=Path(source).name, output=Path(output).name, output_exists=output in corpus)
+        entries = ((key, text) for key, text, _ in corpus.entries(source))
+        if result.output_exists:
+            _tally(result, entries, lambda key: corpus.source(output, key))
+            result.orphaned = [key for key, _, _ in corpus.entries(output) if corpus.find(source, key) is None]
+        else:
+            _tally(result, entries, lambda key: None)
+        results.append(result)
+    return results
+
+
+def _init_worker(config) -> None:
+    global _worker_processor
+    _worker_processor = SilksongProcessor(config)
+
+
+def _analyze_job(job: Tuple[Path, Path]) -> FileCoverage:
+    return analyze_pair(*job, _worker_processor)
+
+
+def analyze_corpus(pairs: List[Tuple[Path, Path]], processor: SilksongProcessor,
+                   workers: int = 1) -> List[FileCoverage]:
+    """Coverage of all (source, output) pairs, in a process pool when workers > 1
+
+    With an index on the processor nothing is parsed, so the pairs are analyzed in-process.
+    """
+    if processor.index is not None or workers <= 1 or len(pairs) <= 1:
+        return analyze_corpus_pairs(processor, pairs)
+    # Each worker builds its own processor once and reuses it for all files
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(processor.config,)) as pool:
+        # Files are small; hand them out in chunks to keep IPC overhead down
+        return list(pool.map(_analyze_job, pairs, chunksize=max(1, len(pairs) // (workers * 4))))
+
+
+def coverage_report(results: List[FileCoverage], seconds: Optional[float] = None) -> Dict[str, Any]:
+    """Totals plus per-file details, ready for json.dump"""
+    totals = {name: sum(getattr(r, name) for r in results)
+              for name in ("units", "empty", "technical", "translatable", "translated",
+                           "source_chars", "source_words", "target_chars", "target_words")}
+    for name in ("untranslated", "identical", "orphaned"):
+        totals[name] = sum(len(getattr(r, name)) for r in results)
+    totals["files"] = len(results)
+    totals["missing_outputs"] = sum(1 for r in results if not r.output_exists)
+    totals["coverage"] = round(totals["translated"] / totals["translatable"], 4) if totals["translatable"] else 1.0
+
+    report = {"generated": time.strftime("%Y-%m-%dT%H:%M:%S"), "totals": totals,
+              "files": [r.to_dict() for r in sorted(results, key=lambda r: r.file)]}
+    if seconds is not None:
+        report["seconds"] = round(seconds, 3)
+    return report
@@ -2,12 +2,40 @@
 Silksong encryption/decryption utilities
 Port of the C# SilksongDecryptor
 """
+import io
+import os
 import json
+import time
 import base64
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any
+from typing import Dict, Any, BinaryIO, List, Optional, Tuple
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.primitives import padding
+
+from src.manifest import BuildManifest, MANIFEST_NAME
+
+BLOCK_SIZE = 16
+# Least common multiple of the AES block and the 3-byte base64 group
+B64_ALIGN = 48
+STREAM_CHUNK = 1024 * 1024 - (1024 * 1024) % B64_ALIGN
+
+
+@dataclass
+class FileResult:
+    """Outcome of encrypting/decrypting a single file in folder mode"""
+    file: str
+    status: str  # "ok", "skipped" or "error"
+    name: str = ""
+    bytes_in: int = 0
+    bytes_out: int = 0
+    seconds: float = 0.0
+    message: str = ""
+    source_sha256: str = ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
 
 
 class SilksongCrypto:
@@ -16,86 +44,258 @@ class SilksongCrypto:
     def __init__(self):
         # Same key as C# version
         self.key = b"UKu52ePUBwetZ9wNX88o54dnfKRu0T1l"
+        # Cipher objects are reusable, only the encryptor/decryptor contexts are one-shot
+        self._cipher = Cipher(algorithms.AES(self.key), modes.ECB())
         
     def encrypt_bytes(self, data: bytes) -> bytes:
         """Encrypt bytes using AES ECB PKCS7"""
-        cipher = Cipher(algorithms.AES(self.key), modes.ECB())
-        encryptor = cipher.encryptor()
-        
-        # Apply PKCS7 padding
-        padder = padding.PKCS7(128).padder()
-        padded_data = padder.update(data) + padder.finalize()
-        
-        # Encrypt
-        encrypted = encryptor.update(padded_data) + encryptor.finalize()
-        return encrypted
+        return bytes(self.encrypt_into(data))
     
     def decrypt_bytes(self, data: bytes) -> bytes:
         """Decrypt bytes using AES ECB PKCS7"""
-        cipher = Cipher(algorithms.AES(self.key), modes.ECB())
-        decryptor = cipher.decryptor()
+        return bytes(self.decrypt_into(data))
+    
+    def encrypt_into(self, data, out: bytearray = None) -> memoryview:
+        """Encrypt a bytes-like object into a preallocated buffer, return a view of the ciphertext"""
+        data = memoryview(data).cast('B')
+        full = len(data) - len(data) % BLOCK_SIZE
+        out_len = full + BLOCK_SIZE
+        # update_into needs block_size - 1 bytes of headroom
+        if out is None:
+            out = bytearray(out_len + BLOCK_SIZE - 1)
+        elif len(out) < out_len + BLOCK_SIZE - 1:
+            raise ValueError(f"Output buffer too small: need {out_len + BLOCK_SIZE - 1} bytes")
+        view = memoryview(out)
+        
+        encryptor = self._cipher.encryptor()
+        written = encryptor.update_into(data[:full], view) if full else 0
+        
+        # Apply PKCS7 padding to the tail block only
+        tail = bytes(data[full:])
+        pad_len = BLOCK_SIZE - len(tail)
+        written += encryptor.update_into(tail + bytes((pad_len,)) * pad_len, view[written:])
+        encryptor.finalize()
+        return view[:written]
+    
+    def decrypt_into(self, data, out: bytearray = None) -> memoryview:
+        """Decrypt a bytes-like object into a preallocated buffer, return a view of the plaintext"""
+        data = memoryview(data).cast('B')
+        if out is None:
+            out = bytearray(len(data) + BLOCK_SIZE - 1)
+        elif len(out) < len(data) + BLOCK_SIZE - 1:
+            raise ValueError(f"Output buffer too small: need {len(data) + BLOCK_SIZE - 1} bytes")
+        view = memoryview(out)
         
-        # Decrypt
-        decrypted_padded = decryptor.update(data) + decryptor.finalize()
+        decryptor = self._cipher.decryptor()
+        written = decryptor.update_into(data, view)
+        decryptor.finalize()
         
         # Remove PKCS7 padding
-        unpadder = padding.PKCS7(128).unpadder()
-        decrypted = unpadder.update(decrypted_padded) + unpadder.finalize()
-        return decrypted
+        pad_len = _check_padding(view[:written])
+        return view[:written - pad_len]
     
     def encrypt_string(self, text: str) -> str:
         """Encrypt string and return base64"""
-        encrypted_bytes = self.encrypt_bytes(text.encode('utf-8'))
-        return base64.b64encode(encrypted_bytes).decode('ascii')
+        encrypted = self.encrypt_into(text.encode('utf-8'))
+        return base64.b64encode(encrypted).decode('ascii')
     
     def decrypt_string(self, encrypted_b64: str) -> str:
         """Decrypt base64 string"""
         encrypted_bytes = base64.b64decode(encrypted_b64)
-        decrypted_bytes = self.decrypt_bytes(encrypted_bytes)
-        return decrypted_bytes.decode('utf-8')
+        return str(self.decrypt_into(encrypted_bytes), 'utf-8')
     
-    def decrypt_folder(self, source_folder: Path, output_folder: Path = None):
-        """Decrypt all .json files in folder"""
-        source_folder = Path(source_folder)
-        if output_folder is None:
-            output_folder = source_folder.parent / f"{source_folder.name}_Decrypted"
+    def encrypt_stream(self, source: BinaryIO, target: BinaryIO, chunk_size: int = STREAM_CHUNK) -> int:
+        """Encrypt plaintext from one file object into base64 ciphertext in another
         
-        output_folder = Path(output_folder)
-        output_folder.mkdir(exist_ok=True)
+        Memory use is bounded by chunk_size regardless of payload size.
+        Returns the number of base64 bytes written.
+        """
+        # Multiple of 48 so every ciphertext chunk base64-encodes without a remainder
+        chunk_size = max(B64_ALIGN, chunk_size - chunk_size % B64_ALIGN)
+        encryptor = self._cipher.encryptor()
+        in_buf = bytearray(chunk_size)
+        out_buf = bytearray(chunk_size + BLOCK_SIZE - 1)
+        in_view, out_view = memoryview(in_buf), memoryview(out_buf)
+        written = 0
         
-        print(f"Decrypting files from {source_folder} to {output_folder}")
+        while True:
+            filled = _read_full(source, in_view)
+            if filled < chunk_size:
+                # Last chunk: pad the tail block and flush
+                full = filled - filled % BLOCK_SIZE
+                n = encryptor.update_into(in_view[:full], out_view) if full else 0
+                pad_len = BLOCK_SIZE - (filled - full)
+                tail = bytes(in_view[full:filled]) + bytes((pad_len,)) * pad_len
+                n += encryptor.update_into(tail, out_view[n:])
+                encryptor.finalize()
+                written += target.write(base64.b64encode(out_view[:n]))
+                return written
+            n = encryptor.update_into(in_view, out_view)
+            written += target.write(base64.b64encode(out_view[:n]))
+    
+    def decrypt_stream(self, source: BinaryIO, target: BinaryIO, chunk_size: int = STREAM_CHUNK) -> int:
+        """Decrypt base64 ciphertext from one file object into plaintext in another
         
-        for json_file in source_folder.glob("*.json"):
-            try:
-                # Read JSON file
-                with open(json_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                # Extract encrypted script
-                name = data.get("m_Name", "")
-                encrypted_script = data.get("m_Script", "")
-                
-                if not encrypted_script:
-                    print(f"  Skipping {json_file.name}: no m_Script field")
-                    continue
-                
-                # Decrypt
-                decrypted_text = self.decrypt_string(encrypted_script)
-                
+        Memory use is bounded by chunk_size regardless of payload size.
+        Returns the number of plaintext bytes written.
+        """
+        decryptor = self._cipher.decryptor()
+        out_buf = bytearray(chunk_size + 2 * BLOCK_SIZE)
+        out_view = memoryview(out_buf)
+        carry_b64 = b""
+        held = b""  # last decrypted block, kept back until we know whether it carries the padding
+        written = 0
+        
+        while True:
+            chunk = source.read(chunk_size)
+            if chunk:
+                # Drop whitespace and keep the 4-char alignment base64 needs
+                chunk = carry_b64 + chunk.translate(None, b" \t\r\n")
+                usable = len(chunk) - len(chunk) % 4
+                carry_b64 = chunk[usable:]
+                ciphertext = base64.b64decode(chunk[:usable])
+            else:
+                if carry_b64:
+                    raise ValueError("Truncated base64 input")
+                ciphertext = b""
+            
+            n = decryptor.update_into(ciphertext, out_view) if ciphertext else 0
+            if n:
+                # Emit everything except the newest full block
+                if held:
+                    written += target.write(held)
+                written += target.write(out_view[:n - BLOCK_SIZE])
+                held = bytes(out_view[n - BLOCK_SIZE:n])
+            
+            if not chunk:
+                decryptor.finalize()
+                pad_len = _check_padding(held)
+                written += target.write(held[:-pad_len])
+                return written
+    
+    def decrypt_file(self, json_file: Path, output_folder: Path) -> FileResult:
+        """Decrypt a single .json asset into a .txt file with name header"""
+        json_file = Path(json_file)
+        started = time.perf_counter()
+        result = FileResult(file=json_file.name, status="ok")
+        
+        try:
+            raw = json_file.read_bytes()
+            result.bytes_in = len(raw)
+            name, decrypted_text = self.decrypt_asset(raw)
+            result.name = name
+            
+            if decrypted_text is None:
+                result.status = "skipped"
+                result.message = "no m_Script field"
+            else:
                 # Save as .txt with name header
                 output_content = f"{name}\n{decrypted_text}"
-                output_file = output_folder / f"{json_file.stem}.txt"
+                output_file = Path(output_folder) / f"{json_file.stem}.txt"
                 
                 with open(output_file, 'w', encoding='utf-8') as f:
                     f.write(output_content)
+                result.bytes_out = output_file.stat().st_size
+                
+        except Exception as e:
+            result.status = "error"
+            result.message = str(e)
+        
+        result.seconds = time.perf_counter() - started
+        return result
+    
+    def decrypt_asset(self, raw: bytes) -> Tuple[str, Optional[str]]:
+        """Turn asset JSON bytes into (m_Name, decrypted script); script is None if absent"""
+        data = json.loads(raw)
+        name = data.get("m_Name", "")
+        encrypted_script = data.get("m_Script", "")
+        if not encrypted_script:
+            return name, None
+        return name, self.decrypt_string(encrypted_script)
+    
+    def encrypt_asset(self, raw: bytes) -> Optional[Tuple[str, str]]:
+        """Turn .txt contents (name header + script) into (name, asset JSON text)
+        
+        Returns None when there is no script after the name line.
+        """
+        lines = io.TextIOWrapper(io.BytesIO(raw), encoding='utf-8').readlines()
+        if len(lines) < 2:
+            return None
+        
+        # First line is name, rest is script
+        name = lines[0].strip()
+        json_data = {
+            "m_Name": name,
+            "m_Script": self.encrypt_string(''.join(lines[1:]))
+        }
+        return name, json.dumps(json_data, indent=4)
+    
+    def encrypt_file(self, txt_file: Path, output_folder: Path) -> FileResult:
+        """Encrypt a single .txt file (name header + script) into a .json asset"""
+        txt_file = Path(txt_file)
+        started = time.perf_counter()
+        result = FileResult(file=txt_file.name, status="ok")
+        
+        try:
+            # Read .txt file (bytes once for the hash, same newline handling as text mode)
+            raw = txt_file.read_bytes()
+            result.bytes_in = len(raw)
+            result.source_sha256 = hashlib.sha256(raw).hexdigest()
+            asset = self.encrypt_asset(raw)
+            
+            if asset is None:
+                result.status = "skipped"
+                result.message = "insufficient lines"
+            else:
+                result.name, json_text = asset
                 
-                print(f"  Decrypted {name}")
+                # Save as .json
+                output_file = Path(output_folder) / f"{txt_file.stem}.json"
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    f.write(json_text)
+                result.bytes_out = output_file.stat().st_size
                 
-            except Exception as e:
-                print(f"  Error decrypting {json_file.name}: {e}")
+        except Exception as e:
+            result.status = "error"
+            result.message = str(e)
+        
+        result.seconds = time.perf_counter() - started
+        return result
     
-    def encrypt_folder(self, source_folder: Path, output_folder: Path = None):
-        """Encrypt all .txt files in folder"""
+    def decrypt_folder(self, source_folder: Path, output_folder: Path = None,
+                       workers: int = 1) -> List[FileResult]:
+        """Decrypt all .json files in folder, optionally across a process pool"""
+        source_folder = Path(source_folder)
+        if output_folder is None:
+            output_folder = source_folder.parent / f"{source_folder.name}_Decrypted"
+        
+        output_folder = Path(output_folder)
+        output_folder.mkdir(exist_ok=True)
+        
+        print(f"Decrypting files from {source_folder} to {output_folder}")
+        
+        files = sorted(source_folder.glob("*.json"))
+        results = self._run_folder("decrypt", files, output_folder, workers)
+        
+        for result in results:
+            if result.status == "ok":
+                print(f"  Decrypted {result.name}")
+            elif result.status == "skipped":
+                print(f"  Skipping {result.file}: {result.message}")
+            else:
+                print(f"  Error decrypting {result.file}: {result.message}")
+        
+        return results
+    
+    def encrypt_folder(self, source_folder: Path, output_folder: Path = None,
+                       workers: int = 1, incremental: bool = False,
+                       force: bool = False) -> List[FileResult]:
+        """Encrypt all .txt files in folder, optionally across a process pool
+        
+        With incremental=True a manifest in the output folder records source and
+        output hashes, and files whose source is unchanged are left untouched.
+        force=True rebuilds everything and refreshes the manifest.
+        """
         source_folder = Path(source_folder)
         if output_folder is None:
             output_folder = source_folder.parent / f"{source_folder.name}_Encrypted"
@@ -105,38 +305,127 @@ class SilksongCrypto:
         
         print(f"Encrypting files from {source_folder} to {output_folder}")
         
-        for txt_file in source_folder.glob("*.txt"):
-            try:
-                # Read .txt file
-                with open(txt_file, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                
-                if len(lines) < 2:
-                    print(f"  Skipping {txt_file.name}: insufficient lines")
-                    continue
-                
-                # First line is name, rest is script
-                name = lines[0].strip()
-                script = ''.join(lines[1:])
-                
-                # Encrypt
-                encrypted_script = self.encrypt_string(script)
-                
-                # Create JSON structure
-                json_data = {
-                    "m_Name": name,
-                    "m_Script": encrypted_script
-                }
-                
-                # Save as .json
+        files = sorted(source_folder.glob("*.txt"))
+        
+        manifest = None
+        unchanged = {}
+        if incremental:
+            manifest = BuildManifest.load(output_folder / MANIFEST_NAME)
+            for txt_file in files:
                 output_file = output_folder / f"{txt_file.stem}.json"
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    json.dump(json_data, f, indent=4)
-                
-                print(f"  Encrypted {name}")
-                
-            except Exception as e:
-                print(f"  Error encrypting {txt_file.name}: {e}")
+                if not force and manifest.is_current(txt_file, output_file):
+                    unchanged[txt_file.name] = FileResult(
+                        file=txt_file.name, status="skipped", message="unchanged",
+                        source_sha256=manifest.files[txt_file.name]["source_sha256"]
+                    )
+        
+        pending = [txt_file for txt_file in files if txt_file.name not in unchanged]
+        built = {r.file: r for r in self._run_folder("encrypt", pending, output_folder, workers)}
+        results = [unchanged.get(txt_file.name) or built[txt_file.name] for txt_file in files]
+        
+        for result in results:
+            if result.status == "ok":
+                print(f"  Encrypted {result.name}")
+            elif result.status == "skipped" and result.message != "unchanged":
+                print(f"  Skipping {result.file}: {result.message}")
+            elif result.status == "error":
+                print(f"  Error encrypting {result.file}: {result.message}")
+        
+        if manifest is not None:
+            for txt_file in pending:
+                result = built[txt_file.name]
+                if result.status == "ok":
+                    manifest.record(txt_file, output_folder / f"{txt_file.stem}.json", result.source_sha256)
+                else:
+                    manifest.forget(txt_file.name)
+            manifest.prune(txt_file.name for txt_file in files)
+            manifest.save()
+            if unchanged:
+                print(f"  {len(unchanged)} unchanged files left as is")
+        
+        return results
+    
+    def _run_folder(self, operation: str, files: List[Path], output_folder: Path,
+                    workers: Optional[int]) -> List[FileResult]:
+        """Run encrypt_file/decrypt_file over files, in-process or in a pool"""
+        workers = resolve_workers(workers, len(files))
+        
+        if workers <= 1:
+            handler = self.decrypt_file if operation == "decrypt" else self.encrypt_file
+            return [handler(path, output_folder) for path in files]
+        
+        # Each worker builds its own SilksongCrypto once and reuses it for all files
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            jobs = [(operation, str(path), str(output_folder)) for path in files]
+            return list(pool.map(_run_worker_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+
+def resolve_workers(workers: Optional[int], job_count: int) -> int:
+    """Translate a --jobs style value into a worker count (0 or None = all cores)"""
+    if not workers or workers < 0:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, job_count))
+
+
+def summarize_results(results: List[FileResult], elapsed: Optional[float] = None) -> Dict[str, Any]:
+    """Aggregate per-file folder results into totals
+
+    seconds is the wall-clock time of the whole run when elapsed is given;
+    worker_seconds adds up the per-file times, which with several workers
+    exceeds the wall-clock time.
+    """
+    summary = {"files": len(results), "ok": 0, "skipped": 0, "error": 0,
+               "bytes_in": 0, "bytes_out": 0, "seconds": 0.0, "worker_seconds": 0.0}
+    for result in results:
+        summary[result.status] += 1
+        summary["bytes_in"] += result.bytes_in
+        summary["bytes_out"] += result.bytes_out
+        summary["worker_seconds"] += result.seconds
+    summary["seconds"] = summary["worker_seconds"] if elapsed is None else elapsed
+    return summary
+
+
+def _check_padding(data: bytes) -> int:
+    """Validate PKCS7 padding and return its length"""
+    if not data or len(data) % BLOCK_SIZE:
+        raise ValueError("Invalid padding bytes.")
+    pad_len = data[-1]
+    if pad_len < 1 or pad_len > BLOCK_SIZE or data[-pad_len:] != bytes((pad_len,)) * pad_len:
+        raise ValueError("Invalid padding bytes.")
+    return pad_len
+
+
+def _read_full(source: BinaryIO, view: memoryview) -> int:
+    """Fill view from source, returning fewer bytes only at EOF"""
+    filled = 0
+    readinto = getattr(source, "readinto", None)
+    while filled < len(view):
+        if readinto is not None:
+            n = readinto(view[filled:])
+        else:
+            data = source.read(len(view) - filled)
+            n = len(data)
+            view[filled:filled + n] = data
+        if not n:
+            break
+        filled += n
+    return filled
+
+
+# Per-process crypto instance used by the folder process pool
+_worker_crypto: Optional[SilksongCrypto] = None
+
+
+def _init_worker():
+    global _worker_crypto
+    _worker_crypto = SilksongCrypto()
+
+
+def _run_worker_job(job) -> FileResult:
+    operation, path, output_folder = job
+    if operation == "decrypt":
+        return _worker_crypto.decrypt_file(Path(path), Path(output_folder))
+    return _worker_crypto.encrypt_file(Path(path), Path(output_folder))
 
 
 def main():
@@ -0,0 +1,58 @@
+"""
+Cross-file deduplication of source strings before they reach the AI provider
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List
+
+from core.src.core.models import TranslationUnit
+from src.translation_memory import normalize_text, rewrap_whitespace
+
+
+@dataclass
+class DedupResult:
+    """Unique source texts and the units that share each of them"""
+    groups: Dict[str, List[TranslationUnit]] = field(default_factory=dict)
+    total_units: int = 0
+    skipped_units: int = 0  # empty/whitespace-only, never sent to the provider
+
+    @property
+    def unique_texts(self) -> List[str]:
+        """One representative original text per group, in first-seen order"""
+        return [units[0].original_text for units in self.groups.values()]
+
+    @property
+    def translatable_units(self) -> int:
+        return self.total_units - self.skipped_units
+
+    @property
+    def ratio(self) -> float:
+        """Share of translatable units saved by deduplication"""
+        if not self.translatable_units:
+            return 0.0
+        return 1 - len(self.groups) / self.translatable_units
+
+    def summary(self) -> str:
+        return (f"{self.translatable_units} units -> {len(self.groups)} unique texts "
+                f"({self.ratio:.1%} deduplicated, {self.skipped_units} empty skipped)")
+
+
+def dedupe_units(units: Iterable[TranslationUnit]) -> DedupResult:
+    """Group units by normalized original text across all files"""
+    result = DedupResult()
+    for unit in units:
+        result.total_units += 1
+        normalized = normalize_text(unit.original_text)
+        if not normalized:
+            result.skipped_units += 1
+            continue
+        result.groups.setdefault(normalized, []).append(unit)
+    return result
+
+
+def fan_out(units: List[TranslationUnit], translation: str) -> None:
+    """Apply one translation to every unit of a group, keeping each unit's own edge whitespace"""
+    if not translation:
+        return
+    core = translation.strip()
+    for unit in units:
+        unit.translated_text = rewrap_whitespace(unit.original_text, core)
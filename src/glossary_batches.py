@@ -0,0 +1,119 @@
+"""
+Batched, concurrent glossary translation with incremental saving
+Only terms without an approved translation are sent; every finished batch is merged into the final glossary
+"""
+import os
+import json
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+from src.async_engine import AsyncBatchRunner, ProviderLimits
+from src.metrics import metrics
+from src.tokens import estimate_tokens
+
+DEFAULT_GLOSSARY_BATCH_SIZE = 20
+
+
+def load_final_glossary(path: Path) -> Dict[str, str]:
+    """{term: translation} of an existing final glossary, empty when there is none"""
+    if not Path(path).exists():
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return dict(json.load(f).get("translations") or {})
+
+
+def pending_terms(terms: Iterable[str], approved: Dict[str, str]) -> List[str]:
+    """Terms in order, without duplicates and without a non-empty approved translation"""
+    return [term for term in dict.fromkeys(terms) if not (approved.get(term) or '').strip()]
+
+
+def save_final_glossary(path: Path, config, translations: Dict[str, str], target_lang: str = "Ukrainian") -> Path:
+    """Atomically write final_glossary.json in the layout step3 and GlossaryManager read"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "project": config.name,
+        "source_lang": config.source_lang,
+        "target_lang": target_lang,
+        "target_lang_code": config.target_lang_code,
+        "translations": dict(sorted(translations.items())),
+        "terms_count": len(translations),
+    }
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with open(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    return path
+
+
+@dataclass
+class GlossaryRun:
+    """Outcome of one batched glossary translation"""
+    translated: Dict[str, str] = field(default_factory=dict)
+    failed: List[str] = field(default_factory=list)  # terms of batches that failed; retried next run
+    batches: int = 0
+    failed_batches: int = 0
+    engine_stats: Dict[str, Any] = field(default_factory=dict)
+
+
+class GlossaryBatchTranslator:
+    """Translates glossary terms in fixed-size batches under the provider's concurrency limits
+
+    Each finished batch is merged into the glossary file right away, so an
+    interrupted run keeps everything translated so far and the next run only
+    sends what is still missing.
+    """
+
+    def __init__(self, ai_provider, config, glossary_path: Path, batch_size: int = DEFAULT_GLOSSARY_BATCH_SIZE,
+                 limits: ProviderLimits = None, max_retries: int = 5, target_lang: str = "Ukrainian"):
+        self.ai_provider = ai_provider
+        self.config = config
+        self.glossary_path = Path(glossary_path)
+        self.batch_size = max(1, batch_size)
+        self.limits = limits or ProviderLimits()
+        self.max_retries = max_retries
+        self.target_lang = target_lang
+
+    def _request(self, batch: List[str]) -> Dict[str, str]:
+        result = self.ai_provider.translate_glossary(batch, source_lang=self.config.source_lang,
+                                                     target_lang=self.target_lang)
+        if isinstance(result, dict):
+            return {term: result[term] for term in batch if (result.get(term) or '').strip()}
+        # Providers answering with a plain list keep the request order
+        return {term: text for term, text in zip(batch, result or []) if (text or '').strip()}
+
+    @staticmethod
+    def _cost(batch: List[str]) -> float:
+        return estimate_tokens('\n'.join(batch)) * 2
+
+    def translate(self, terms: List[str], glossary: Dict[str, str]) -> GlossaryRun:
+        """Translate terms into glossary (updated in place and saved after every batch)"""
+        batches = [terms[start:start + self.batch_size] for start in range(0, len(terms), self.batch_size)]
+        run = GlossaryRun(batches=len(batches))
+
+        def merge(index: int, outcome: Any) -> None:
+            batch = batches[index]
+            if isinstance(outcome, Exception):
+                print(f"  Batch {index + 1}/{len(batches)} failed: {outcome}")
+                run.failed_batches += 1
+                run.failed.extend(batch)
+                return
+            glossary.update(outcome)
+            run.translated.update(outcome)
+            run.failed.extend(term for term in batch if term not in outcome)
+            save_final_glossary(self.glossary_path, self.config, glossary, self.target_lang)
+            metrics.count("glossary_terms_translated", len(outcome))
+            print(f"  Batch {index + 1}/{len(batches)}: {len(outcome)}/{len(batch)} terms")
+
+        runner = AsyncBatchRunner(self.limits, max_retries=self.max_retries)
+        with metrics.span("step2.translate_batches"):
+            runner.run(batches, self._request, cost=self._cost, on_result=merge)
+        run.engine_stats = runner.stats
+        return run
@@ -0,0 +1,86 @@
+"""
+Multi-pattern glossary matcher
+Finds which glossary terms occur in a batch so only those go into the prompt
+"""
+import re
+from typing import Dict, Iterable, List, Set
+
+# What may follow a term and still count as the term: possessive or plural
+_SUFFIX = r"(?:['’]s|&#8217;s|s|es)?"
+
+_camel_boundary = re.compile(r'(?<=[a-z])(?=[A-Z])')
+
+
+def term_variants(term: str) -> Set[str]:
+    """Lowercase spellings a term may appear under in game text ("ClingGrip" -> "cling grip")"""
+    variants = {term.lower(), _camel_boundary.sub(' ', term).lower()}
+    # Plural glossary entries ("Bellways") should also catch the singular
+    variants |= {variant[:-1] for variant in variants if variant.endswith('s') and len(variant) > 4}
+    return {variant for variant in variants if variant.strip()}
+
+
+def _trie_pattern(words: Iterable[str]) -> str:
+    """Regex alternation factored through a trie, so matching costs ~one pass in the C engine"""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node: Dict) -> str:
+        ends_here = '' in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch != '']
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if ends_here:
+            # Greedy optional: prefer the longer term, fall back to the shorter one
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+class GlossaryMatcher:
+    """Precompiled matcher over all glossary terms (case-insensitive, whole words)
+
+    Built once per glossary. Text is lowercased once and scanned by a single
+    trie-factored pattern, which like Aho-Corasick never re-tries a prefix
+    shared by several terms.
+    """
+
+    def __init__(self, glossary: Dict[str, str]):
+        self.glossary = dict(glossary or {})
+        self._by_variant: Dict[str, str] = {}
+        for term in self.glossary:
+            for variant in term_variants(term):
+                self._by_variant.setdefault(variant, term)
+
+        if self._by_variant:
+            # Lowercasing the text up front is ~2x faster than re.IGNORECASE
+            self._pattern = re.compile(
+                r'(?<!\w)(' + _trie_pattern(self._by_variant) + ')' + _SUFFIX + r'(?!\w)'
+            )
+        else:
+            self._pattern = None
+
+    def find_terms(self, text: str) -> Set[str]:
+        """Glossary terms (original spelling) occurring in text"""
+        if self._pattern is None:
+            return set()
+        found = set()
+        for variant in self._pattern.findall(text.lower()):
+            term = self._by_variant.get(variant)
+            if term is not None:
+                found.add(term)
+        return found
+
+    def terms_for(self, texts: Iterable[str]) -> List[str]:
+        """Sorted terms occurring in any of texts"""
+        # One scan over the joined batch instead of one per text
+        return sorted(self.find_terms('\n'.join(texts)))
+
+    def subset(self, texts: Iterable[str]) -> Dict[str, str]:
+        """The part of the glossary relevant to texts, ready to inject into a prompt"""
+        return {term: self.glossary[term] for term in self.terms_for(texts)}
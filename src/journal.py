@@ -0,0 +1,142 @@
+"""
+Append-only checkpoint journal for step3
+One JSON line per completed batch, so an interrupted run can resume without re-paying for finished work
+"""
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+from src.translation_memory import normalize_text
+
+JOURNAL_VERSION = 1
+
+# Flushing every record survives a killed process; fsync is batched since it costs milliseconds
+DEFAULT_SYNC_EVERY = 20
+DEFAULT_SYNC_INTERVAL = 5.0
+
+
+class TranslationJournal:
+    """Crash-safe record of completed batches: keys, translations and provider metadata
+
+    The first line is a header describing the run (provider, target language,
+    glossary version). Every following line is one batch. A torn last line from
+    a crash mid-write is dropped on replay and truncated before appending.
+    """
+
+    def __init__(self, path: Path, sync_every: int = DEFAULT_SYNC_EVERY,
+                 sync_interval: float = DEFAULT_SYNC_INTERVAL):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.header: Dict = {}
+        self.completed: Dict[str, str] = {}  # normalized source text -> translation
+        self.batches = 0
+        self._file = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def start(self, header: Dict, resume: bool = False) -> int:
+        """Open the journal for appending; returns the number of batches replayed
+
+        Without resume (or when the existing journal belongs to a different run)
+        the old journal is moved aside to *.prev and a new one is started.
+        """
+        header = dict(header, journal=JOURNAL_VERSION)
+        replayed = 0
+        if resume and self.path.exists():
+            replayed, good_size = self._replay()
+            if self._compatible(header):
+                with open(self.path, 'r+b') as f:
+                    f.truncate(good_size)
+                self._file = open(self.path, 'a', encoding='utf-8')
+                return replayed
+            print(f"Journal {self.path} was written for {self.header}, starting a new one")
+            self.completed.clear()
+            self.batches = replayed = 0
+
+        if self.path.exists():
+            os.replace(self.path, self.path.with_name(self.path.name + '.prev'))
+        self.header = header
+        self._file = open(self.path, 'w', encoding='utf-8')
+        self._append(header)
+        self._sync()
+        return replayed
+
+    def _compatible(self, header: Dict) -> bool:
+        # A glossary edit changes the right translations, like the translation memory key
+        keys = ("journal", "project", "target_lang", "provider", "glossary_version")
+        return all(self.header.get(key) == header.get(key) for key in keys)
+
+    def _replay(self) -> Tuple[int, int]:
+        """Load header and completed batches; returns (batches, size of the intact prefix)"""
+        good_size = 0
+        with open(self.path, 'rb') as f:
+            for raw in f:
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    break
+                if not raw.endswith(b'\n'):
+                    break
+                good_size += len(raw)
+                if "journal" in record:
+                    self.header = record
+                    continue
+                self.completed.update(zip(record["texts"], record["translations"]))
+                self.batches += 1
+        return self.batches, good_size
+
+    def lookup(self, text: str) -> Optional[str]:
+        return self.completed.get(normalize_text(text))
+
+    def record(self, keys: Sequence[Sequence[Tuple[str, str]]], texts: Sequence[str],
+               translations: Sequence[str], **metadata) -> None:
+        """Append one completed batch; keys holds the (file, key) pairs behind each text"""
+        normalized = [normalize_text(text) for text in texts]
+        entry = {
+            "batch": self.batches,
+            "texts": normalized,
+            "translations": list(translations),
+            "keys": [[list(pair) for pair in pairs] for pairs in keys],
+            "time": round(time.time(), 3),
+            **metadata,
+        }
+        with self._lock:
+            self.completed.update(zip(normalized, translations))
+            self.batches += 1
+            self._append(entry)
+            self._unsynced += 1
+            if (self._unsynced >= self.sync_every or
+                    time.monotonic() - self._last_sync >= self.sync_interval):
+                self._sync()
+
+    def _append(self, record: Dict) -> None:
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+    def _sync(self) -> None:
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                self._sync()
+                self._file.close()
+                self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self.completed)
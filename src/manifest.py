@@ -0,0 +1,111 @@
+"""
+Build manifest for incremental encryption
+Tracks source/output hashes so unchanged assets are not rebuilt
+"""
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Dict, Any, Iterable
+
+MANIFEST_NAME = ".silksong_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def file_sha256(path: Path) -> str:
+    """SHA-256 hex digest of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """Per-file record of source hash, output hash and mtimes for one output folder"""
+
+    def __init__(self, path: Path, files: Dict[str, Dict[str, Any]] = None):
+        self.path = Path(path)
+        self.files = files or {}
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path: Path) -> "BuildManifest":
+        """Load manifest from disk, starting empty if missing or unreadable"""
+        path = Path(path)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get("version") == MANIFEST_VERSION:
+                return cls(path, data.get("files", {}))
+        except (OSError, ValueError):
+            pass
+        return cls(path)
+
+    def is_current(self, source: Path, output: Path) -> bool:
+        """True if output was built from the current source and hasn't been touched since"""
+        entry = self.files.get(source.name)
+        if entry is None:
+            return False
+
+        try:
+            source_stat = source.stat()
+            output_stat = output.stat()
+        except OSError:
+            return False
+
+        # Output replaced or edited by hand since we wrote it
+        if (output_stat.st_size != entry["output_size"] or
+                output_stat.st_mtime_ns != entry["output_mtime_ns"]):
+            return False
+
+        # Fast path: source untouched since last build
+        if (source_stat.st_mtime_ns == entry["source_mtime_ns"] and
+                source_stat.st_size == entry["source_size"]):
+            return True
+
+        if source_stat.st_size != entry["source_size"]:
+            return False
+
+        # Touched (e.g. saved without edits, git checkout) - compare content
+        if file_sha256(source) != entry["source_sha256"]:
+            return False
+        entry["source_mtime_ns"] = source_stat.st_mtime_ns
+        self.dirty = True
+        return True
+
+    def record(self, source: Path, output: Path, source_sha256: str = None) -> None:
+        """Remember a freshly built output"""
+        source_stat = source.stat()
+        output_stat = output.stat()
+        self.files[source.name] = {
+            "output": output.name,
+            "source_sha256": source_sha256 or file_sha256(source),
+            "source_size": source_stat.st_size,
+            "source_mtime_ns": source_stat.st_mtime_ns,
+            "output_sha256": file_sha256(output),
+            "output_size": output_stat.st_size,
+            "output_mtime_ns": output_stat.st_mtime_ns,
+        }
+        self.dirty = True
+
+    def forget(self, source_name: str) -> None:
+        """Drop a file so it is rebuilt next time"""
+        if self.files.pop(source_name, None) is not None:
+            self.dirty = True
+
+    def prune(self, source_names: Iterable[str]) -> None:
+        """Drop entries for sources that no longer exist"""
+        keep = set(source_names)
+        for name in [name for name in self.files if name not in keep]:
+            self.forget(name)
+
+    def save(self) -> None:
+        """Atomically write the manifest if anything changed"""
+        if not self.dirty:
+            return
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self.dirty = False
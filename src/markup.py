@@ -0,0 +1,187 @@
+"""
+Markup and placeholder validation of translations against their source text
+Page/speaker tags, {n} placeholders, line breaks, character references and length ratios
+"""
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.processor import SilksongProcessor
+
+# Issue kinds; errors break the text in game, warnings are worth a second request
+TAGS = "tags"
+PLACEHOLDERS = "placeholders"
+ENTITIES = "entities"
+LINE_BREAKS = "line_breaks"
+APOSTROPHES = "apostrophes"
+LENGTH = "length"
+ERROR_KINDS = frozenset((TAGS, PLACEHOLDERS, ENTITIES))
+
+MIN_LENGTH_RATIO = 0.4
+MAX_LENGTH_RATIO = 2.5
+# Shorter sources (names, menu items) legitimately change length a lot
+MIN_RATIO_LENGTH = 20
+
+# Created by the pool initializer, once per worker process
+_worker_processor: Optional[SilksongProcessor] = None
+
+# Dialogue structure: <page>, <hpage>, <page=S> (speaker); order matters
+_page_tag = re.compile(r'<(h?page)(?:=(\w+))?>')
+_br_tag = re.compile(r'<br>')
+_any_tag = re.compile(r'<[^<>]*>')
+_known_tag = re.compile(r'<(?:h?page(?:=\w+)?|br)>')
+_placeholder = re.compile(r'\{\d+\}')
+# Character references are kept verbatim in unit text (&#8217; etc.)
+_char_ref = re.compile(r'&#(\d+);|&#x([0-9a-fA-F]+);')
+_double_escaped = re.compile(r'&amp;(?:#\d+|#x[0-9a-fA-F]+|\w+);')
+_broken_ref = re.compile(r'&#(?:x[0-9a-fA-F]*|\d*)(?![0-9a-fA-F;])')
+# Ukrainian apostrophe only sits before я/ю/є/ї; anywhere else after a Cyrillic
+# letter it is a leftover of an English contraction ("ти&#8217; накопичуєш")
+_stray_apostrophe = re.compile(r"(?<=[а-яіїєґ])(?:&#8217;|')(?![яюєї])", re.IGNORECASE)
+
+
+def _pages(text: str) -> List[str]:
+    return [f"<{name}={speaker}>" if speaker else f"<{name}>" for name, speaker in _page_tag.findall(text)]
+
+
+def _visible_length(text: str) -> int:
+    return len(_char_ref.sub('_', _any_tag.sub('', text)).strip())
+
+
+def check_markup(source: str, translation: str) -> List[Tuple[str, str]]:
+    """(kind, message) for every problem of one translation; empty when it is fine"""
+    issues = []
+
+    source_pages, target_pages = _pages(source), _pages(translation)
+    if source_pages != target_pages:
+        issues.append((TAGS, f"page tags {' '.join(target_pages) or 'none'}, "
+                             f"expected {' '.join(source_pages) or 'none'}"))
+    unknown = [tag for tag in _any_tag.findall(translation) if not _known_tag.fullmatch(tag)]
+    if unknown or translation.count('<') != translation.count('>'):
+        issues.append((TAGS, f"malformed or unknown tags {' '.join(unknown) or '(unbalanced < >)'}"))
+
+    if sorted(_placeholder.findall(source)) != sorted(_placeholder.findall(translation)):
+        issues.append((PLACEHOLDERS, f"placeholders {_placeholder.findall(translation)}, "
+                                     f"expected {_placeholder.findall(source)}"))
+
+    double = _double_escaped.findall(translation)
+    if double:
+        issues.append((ENTITIES, f"double-escaped {' '.join(sorted(set(double)))}"))
+    if _broken_ref.search(translation):
+        issues.append((ENTITIES, "character reference without ';'"))
+    for decimal, hexadecimal in _char_ref.findall(translation):
+        code = int(decimal) if decimal else int(hexadecimal, 16)
+        if code == 0 or code > 0x10FFFF or 0xD800 <= code <= 0xDFFF:
+            issues.append((ENTITIES, f"invalid character reference &#{decimal or 'x' + hexadecimal};"))
+
+    source_breaks = len(_br_tag.findall(source)) + source.strip().count('\n')
+    target_breaks = len(_br_tag.findall(translation)) + translation.strip().count('\n')
+    if source_breaks != target_breaks:
+        issues.append((LINE_BREAKS, f"{target_breaks} line breaks, expected {source_breaks}"))
+
+    # Quoted text (&#8216;...&#8217;) legitimately closes after a letter
+    if '&#8216;' not in translation:
+        stray = len(_stray_apostrophe.findall(translation))
+        if stray:
+            issues.append((APOSTROPHES, f"{stray} apostrophe(s) left over from English contractions"))
+
+    source_length = _visible_length(source)
+    if source_length >= MIN_RATIO_LENGTH:
+        ratio = _visible_length(translation) / source_length
+        if not MIN_LENGTH_RATIO <= ratio <= MAX_LENGTH_RATIO:
+            issues.append((LENGTH, f"length ratio {ratio:.2f} outside "
+                                   f"{MIN_LENGTH_RATIO}-{MAX_LENGTH_RATIO}"))
+    return issues
+
+
+def has_errors(issues: List[Tuple[str, str]]) -> bool:
+    return any(kind in ERROR_KINDS for kind, _ in issues)
+
+
+@dataclass
+class MarkupIssue:
+    """One problem in one translated entry"""
+    key: str
+    kind: str
+    message: str
+    file: str = ""
+
+
+@dataclass
+class FileMarkup:
+    """Validation results for one source file and its translated output"""
+    file: str
+    output: str
+    output_exists: bool = False
+    checked: int = 0
+    issues: List[MarkupIssue] = field(default_factory=list)
+
+    @property
+    def invalid_keys(self) -> List[str]:
+        return list(dict.fromkeys(issue.key for issue in self.issues))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def validate_pair(source_path: Path, output_path: Path, processor: SilksongProcessor) -> FileMarkup:
+    """Check every translated entry of one DE_* output against its EN_* source"""
+    result = FileMarkup(file=Path(source_path).name, output=Path(output_path).name)
+    result.output_exists = Path(output_path).exists()
+    if not result.output_exists:
+        return result
+    source = dict(processor.iter_entries(source_path))
+    # Raw entry text, so references double-escaped on disk (&amp;#8217;) are visible
+    target = dict(processor.iter_entries(output_path, raw=True))
+
+    for key, text in source.items():
+        translation = target.get(key)
+        if translation is None or not text.strip():
+            continue
+        result.checked += 1
+        translation = translation.replace('&lt;', '<').replace('&gt;', '>')
+        for kind, message in check_markup(text, translation):
+            result.issues.append(MarkupIssue(key, kind, message))
+    return result
+
+
+def _init_worker(config) -> None:
+    global _worker_processor
+    _worker_processor = SilksongProcessor(config)
+
+
+def _validate_job(job: Tuple[Path, Path]) -> FileMarkup:
+    return validate_pair(*job, _worker_processor)
+
+
+def validate_corpus(pairs: List[Tuple[Path, Path]], processor: SilksongProcessor,
+                    workers: int = 1) -> List[FileMarkup]:
+    """validate_pair over all (source, output) pairs, in a process pool when workers > 1"""
+    if workers <= 1 or len(pairs) <= 1:
+        return [validate_pair(source, output, processor) for source, output in pairs]
+    # Each worker builds its own processor once and reuses it for all files
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(processor.config,)) as pool:
+        return list(pool.map(_validate_job, pairs, chunksize=max(1, len(pairs) // (workers * 4))))
+
+
+def markup_report(results: List[FileMarkup], seconds: Optional[float] = None) -> Dict[str, Any]:
+    """Totals by issue kind plus per-file issues, ready for json.dump"""
+    kinds: Dict[str, int] = {}
+    for result in results:
+        for issue in result.issues:
+            kinds[issue.kind] = kinds.get(issue.kind, 0) + 1
+    totals = {
+        "files": len(results),
+        "checked": sum(r.checked for r in results),
+        "invalid": sum(len(r.invalid_keys) for r in results),
+        "errors": sum(count for kind, count in kinds.items() if kind in ERROR_KINDS),
+        "kinds": dict(sorted(kinds.items())),
+    }
+    report = {"generated": time.strftime("%Y-%m-%dT%H:%M:%S"), "totals": totals,
+              "files": [r.to_dict() for r in sorted(results, key=lambda r: r.file) if r.issues]}
+    if seconds is not None:
+        report["seconds"] = round(seconds, 3)
+    return report
@@ -0,0 +1,229 @@
+"""
+Lightweight pipeline instrumentation
+Span timings, counters, latency histograms and cache hit rates, exported as JSON or Prometheus text
+"""
+import json
+import time
+import random
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from src.tokens import estimate_tokens
+
+# Latency samples kept per series; beyond this a uniform reservoir sample is kept
+MAX_SAMPLES = 10_000
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _escape_label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def payload_tokens(value) -> int:
+    """Estimated tokens in a provider argument or result (str, list/tuple, dict)"""
+    if isinstance(value, str):
+        return estimate_tokens(value) if value else 0
+    if isinstance(value, dict):
+        return sum(payload_tokens(k) + payload_tokens(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(payload_tokens(item) for item in value)
+    return 0
+
+
+class Metrics:
+    """Thread-safe registry of spans, counters, latency samples and cache stats
+
+    Recording is a perf_counter() pair and a dict update under a lock, cheap
+    enough to leave on for every run.
+    """
+
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        self.max_samples = max_samples
+        self.started = time.time()
+        self._spans: Dict[Tuple[str, Labels], List[float]] = {}  # [count, total, max]
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._samples: Dict[Tuple[str, Labels], List[float]] = {}
+        self._seen: Dict[Tuple[str, Labels], int] = {}
+        self._caches: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **labels):
+        """Time a stage (or one file of it with file=...)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            key = (name, _labels(labels))
+            with self._lock:
+                stats = self._spans.get(key)
+                if stats is None:
+                    self._spans[key] = [1, elapsed, elapsed]
+                else:
+                    stats[0] += 1
+                    stats[1] += elapsed
+                    stats[2] = max(stats[2], elapsed)
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record a latency sample for percentile reporting"""
+        key = (name, _labels(labels))
+        with self._lock:
+            seen = self._seen.get(key, 0) + 1
+            self._seen[key] = seen
+            samples = self._samples.setdefault(key, [])
+            if len(samples) < self.max_samples:
+                samples.append(value)
+            else:
+                slot = random.randrange(seen)
+                if slot < self.max_samples:
+                    samples[slot] = value
+
+    def cache(self, name: str, hits: int, misses: int) -> None:
+        """Set the hit/miss totals of a cache (translation memory, journal, ...)"""
+        with self._lock:
+            self._caches[name] = (hits, misses)
+
+    def report(self) -> Dict[str, Any]:
+        """Everything recorded so far as a JSON-ready dict"""
+        with self._lock:
+            spans = [{"name": name, **dict(labels), "count": int(count),
+                      "seconds": round(total, 6), "max_seconds": round(peak, 6)}
+                     for (name, labels), (count, total, peak) in sorted(self._spans.items())]
+            counters = [{"name": name, **dict(labels), "value": value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            latencies = []
+            for (name, labels), samples in sorted(self._samples.items()):
+                ordered = sorted(samples)
+                latencies.append({
+                    "name": name, **dict(labels), "count": self._seen[(name, labels)],
+                    "p50": round(_percentile(ordered, 0.50), 6),
+                    "p90": round(_percentile(ordered, 0.90), 6),
+                    "p99": round(_percentile(ordered, 0.99), 6),
+                    "max": round(ordered[-1], 6),
+                    "mean": round(sum(ordered) / len(ordered), 6),
+                })
+            caches = {name: {"hits": hits, "misses": misses,
+                             "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0}
+                      for name, (hits, misses) in sorted(self._caches.items())}
+        return {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "seconds": round(time.time() - self.started, 3),
+            "spans": spans,
+            "counters": counters,
+            "latency": latencies,
+            "caches": caches,
+        }
+
+    def to_prometheus(self, prefix: str = "silksong") -> str:
+        """Prometheus text exposition format (for node_exporter's textfile collector)"""
+        report = self.report()
+        lines = []
+
+        def series(name: str, labels: Dict[str, Any], value) -> str:
+            body = ",".join(f'{key}="{_escape_label(val)}"' for key, val in labels.items())
+            return f"{prefix}_{name}{{{body}}} {value}" if body else f"{prefix}_{name} {value}"
+
+        lines.append(f"# TYPE {prefix}_span_seconds_total counter")
+        for span in report["spans"]:
+            labels = {k: v for k, v in span.items() if k not in ("count", "seconds", "max_seconds")}
+            lines.append(series("span_seconds_total", labels, span["seconds"]))
+            lines.append(series("span_count_total", labels, span["count"]))
+        for counter in report["counters"]:
+            if f"# TYPE {prefix}_{counter['name']}_total counter" not in lines:
+                lines.append(f"# TYPE {prefix}_{counter['name']}_total counter")
+            labels = {k: v for k, v in counter.items() if k not in ("name", "value")}
+            lines.append(series(f"{counter['name']}_total", labels, counter["value"]))
+        lines.append(f"# TYPE {prefix}_latency_seconds summary")
+        for latency in report["latency"]:
+            labels = {k: v for k, v in latency.items()
+                      if k not in ("count", "p50", "p90", "p99", "max", "mean")}
+            for q in ("p50", "p90", "p99"):
+                lines.append(series("latency_seconds", {**labels, "quantile": f"0.{q[1:]}"}, latency[q]))
+            lines.append(series("latency_seconds_count", labels, latency["count"]))
+        lines.append(f"# TYPE {prefix}_cache_hits_total counter")
+        for name, cache in report["caches"].items():
+            lines.append(series("cache_hits_total", {"cache": name}, cache["hits"]))
+            lines.append(series("cache_misses_total", {"cache": name}, cache["misses"]))
+        return "\n".join(lines) + "\n"
+
+    def export(self, json_path: Path = None, prometheus_path: Path = None) -> None:
+        """Write the JSON run report and/or the Prometheus text file"""
+        if json_path:
+            json_path = Path(json_path)
+            json_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, indent=2, ensure_ascii=False)
+            print(f"Run report saved to: {json_path}")
+        if prometheus_path:
+            prometheus_path = Path(prometheus_path)
+            prometheus_path.parent.mkdir(parents=True, exist_ok=True)
+            prometheus_path.write_text(self.to_prometheus(), encoding='utf-8')
+            print(f"Prometheus metrics saved to: {prometheus_path}")
+
+    def summary(self) -> str:
+        """One line per top-level stage and provider, for the end of a run"""
+        report = self.report()
+        lines = [f"{span['name']}: {span['seconds']:.2f}s" for span in report["spans"] if "file" not in span]
+        for latency in report["latency"]:
+            lines.append(f"{latency.get('provider', latency['name'])}.{latency.get('method', '')}: "
+                         f"{latency['count']} calls, p50 {latency['p50'] * 1000:.0f} ms, "
+                         f"p99 {latency['p99'] * 1000:.0f} ms")
+        return "\n".join(lines)
+
+
+class InstrumentedProvider:
+    """AI provider wrapper that times every method call and counts estimated tokens
+
+    Wrap the real provider (inside any CachedProvider) so latencies are real
+    network/model calls. Non-callable attributes pass straight through.
+    """
+
+    def __init__(self, provider, registry: Metrics = None, name: str = None):
+        self.provider = provider
+        self.metrics = registry or metrics
+        self.name = name or getattr(provider, "model_name", type(provider).__name__)
+
+    def __getattr__(self, attr):
+        target = getattr(self.provider, attr)
+        if not callable(target) or attr.startswith('_'):
+            return target
+
+        def call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = target(*args, **kwargs)
+            except Exception:
+                self.metrics.count("provider_errors", provider=self.name, method=attr)
+                raise
+            finally:
+                self.metrics.observe("provider_latency_seconds", time.perf_counter() - started,
+                                     provider=self.name, method=attr)
+            self.metrics.count("prompt_tokens", payload_tokens(args) + payload_tokens(kwargs),
+                               provider=self.name, method=attr)
+            self.metrics.count("completion_tokens", payload_tokens(result), provider=self.name, method=attr)
+            return result
+
+        return call
+
+
+# Process-wide registry used by the processor, translator and step scripts
+metrics = Metrics()
@@ -0,0 +1,112 @@
+"""
+Patch diff between two game versions of the source text
+Classifies entries as added/changed/removed/unchanged so only real changes get retranslated
+"""
+import re
+import json
+import hashlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.corpus import Corpus
+from src.processor import SilksongProcessor
+
+ADDED = "added"
+CHANGED = "changed"
+REMOVED = "removed"
+UNCHANGED = "unchanged"
+
+# EN_Credits List-resources.assets-79.txt -> Credits List (asset numbers shift between patches)
+_asset_name = re.compile(r'^[A-Z]{2}_(.+?)(?:-resources\.assets-\d+)?(?:\.\w+)?$')
+
+# One corpus file per asset base name; the source column holds the entry text or its hash
+Snapshot = Corpus
+
+
+def asset_base_name(filename: str) -> str:
+    """Language- and asset-number-independent name of a localization file"""
+    match = _asset_name.match(Path(filename).name)
+    return match.group(1) if match else Path(filename).stem
+
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def load_snapshot(processor: SilksongProcessor, folder: Path, prefix: str,
+                  hashed: bool = False) -> Tuple[Snapshot, Dict[str, Path]]:
+    """Read every {prefix}_* .txt or encrypted .json file in folder; returns (snapshot, {base name: path})
+
+    With hashed=True the snapshot holds source hashes instead of texts.
+    """
+    paths: Dict[str, Path] = {}
+    for path in sorted(Path(folder).glob(f"{prefix}_*")):
+        if path.suffix in ('.txt', '.json'):
+            # Two asset numbers of one base name: the later file wins
+            paths[asset_base_name(path.name)] = path
+
+    snapshot = processor.read_corpus(paths.values(), name=lambda path: asset_base_name(path.name))
+    if hashed:
+        snapshot.sources[:] = [text_hash(text) for text in snapshot.sources]
+    return snapshot, paths
+
+
+def snapshot_text(snapshot: Snapshot, base: str, key: str) -> Optional[str]:
+    """Text (or hash) of one entry, None when the file or key is not in the snapshot"""
+    return snapshot.source(base, key) if base in snapshot else None
+
+
+@dataclass
+class PatchDiff:
+    """Per-entry classification of a new source snapshot against the previous one"""
+    status: Dict[Tuple[str, str], str] = field(default_factory=dict)
+
+    def counts(self) -> Dict[str, int]:
+        counts = {ADDED: 0, CHANGED: 0, REMOVED: 0, UNCHANGED: 0}
+        for status in self.status.values():
+            counts[status] += 1
+        return counts
+
+    def keys_with(self, *statuses: str) -> List[Tuple[str, str]]:
+        return [entry for entry, status in self.status.items() if status in statuses]
+
+    def summary(self) -> str:
+        counts = self.counts()
+        return ", ".join(f"{counts[name]} {name}" for name in (ADDED, CHANGED, REMOVED, UNCHANGED))
+
+    def save(self, path: Path) -> None:
+        """Write a JSON report grouped by file, leaving out unchanged entries"""
+        files: Dict[str, Dict[str, List[str]]] = {}
+        for (base, key), status in sorted(self.status.items()):
+            if status != UNCHANGED:
+                files.setdefault(base, {}).setdefault(status, []).append(key)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"counts": self.counts(), "files": files}, f, indent=2, ensure_ascii=False)
+
+
+def diff_snapshots(previous: Snapshot, current: Snapshot, bases: Iterable[str] = None) -> PatchDiff:
+    """Compare source hashes entry by entry (both snapshots keyed by asset base name)
+
+    bases limits the comparison to these files, e.g. when only some were read.
+    """
+    diff = PatchDiff()
+    if bases is None:
+        bases = set(previous.files) | set(current.files)
+    for base in bases:
+        new_keys = set()
+        if base in current:
+            for key, new_hash, _ in current.entries(base):
+                new_keys.add(key)
+                old_hash = snapshot_text(previous, base, key)
+                if old_hash is None:
+                    diff.status[(base, key)] = ADDED
+                elif old_hash != new_hash:
+                    diff.status[(base, key)] = CHANGED
+                else:
+                    diff.status[(base, key)] = UNCHANGED
+        if base in previous:
+            for key, _, _ in previous.entries(base):
+                if key not in new_keys:
+                    diff.status[(base, key)] = REMOVED
+    return diff
@@ -1,87 +1,272 @@
 """
 Silksong-specific file processor for XML localization files
 """
+import io
+import os
 import re
+import json
+import hashlib
+import tempfile
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
 from xml.sax.saxutils import escape, unescape
 
 # When core is added as submodule, these imports will work
 import sys
 from pathlib import Path
 
+# Characters read per step when parsing incrementally
+READ_CHUNK_SIZE = 64 * 1024
+
+# Bump when parsing changes, so on-disk parsed-unit caches are not reused
+UNIT_CACHE_VERSION = 1
+
+# Numeric character references (&#8217;) stay verbatim in unit text and must be written back as is
+_escaped_char_ref = re.compile(r'&amp;(#\d+|#x[0-9a-fA-F]+);')
+
 from core.src.processors.base_file_processor import BaseFileProcessor
 from core.src.core.models import LineTranslationUnit, TranslationUnit, ProjectConfig
+from src.corpus import Corpus
+from src.crypto import SilksongCrypto
+from src.manifest import file_sha256
+from src.metrics import metrics
 
 
 class SilksongProcessor(BaseFileProcessor):
     """File processor for Silksong XML localization files"""
     
-    def __init__(self, config: ProjectConfig):
+    def __init__(self, config: ProjectConfig, unit_cache_dir: Path = None, index=None):
         super().__init__(config)
         self.entry_pattern = re.compile(r'<entry name="([^"]+)">([^<]*)</entry>')
+        # How many write_file calls replaced the target vs found it already up to date
+        self.write_stats = {"written": 0, "skipped": 0}
+        # Encrypted EN_*.json assets are decrypted in memory; parsed (key, text) pairs
+        # are cached by asset hash in memory and, optionally, on disk
+        self.crypto = SilksongCrypto()
+        self.unit_cache_dir = Path(unit_cache_dir) if unit_cache_dir else None
+        self._parsed: Dict[str, List[Tuple[str, str]]] = {}
+        self.cache_stats = {"hits": 0, "misses": 0}
+        # Optional CorpusIndex (src.corpus_index): files it holds are read from the mmap, not parsed
+        self.index = index
     
     def read_file(self, file_path: Path) -> List[TranslationUnit]:
         """Read Silksong XML file and extract translation units"""
-        units = []
-        
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Find all entry elements
-            matches = self.entry_pattern.findall(content)
-            
-            for name, text in matches:
-                # Unescape HTML entities
-                clean_text = unescape(text)
-                
-                unit = LineTranslationUnit(
-                    key=name,
-                    original_text=clean_text,
-                    metadata={
-                        'source_file': str(file_path),
-                        'entry_name': name
-                    }
-                )
-                units.append(unit)
-                
+            with metrics.span("read_file", file=Path(file_path).name):
+                return list(self.iter_units(file_path))
         except Exception as e:
             print(f"Error reading file {file_path}: {e}")
             raise
+    
+    def iter_units(self, file_path: Path, file_obj: TextIO = None) -> Iterator[LineTranslationUnit]:
+        """Lazily yield translation units while reading the file in chunks
         
-        return units
+        Reads from file_obj when given (file_path is then only used for metadata).
+        All units of a file share one interned source_file string.
+        """
+        source_file = sys.intern(str(file_path))
+        entries = self.iter_entries(file_path) if file_obj is None else self._scan_entries(file_obj)
+        for name, text in entries:
+            yield LineTranslationUnit(
+                key=name,
+                original_text=text,
+                metadata={'source_file': source_file, 'entry_name': name}
+            )
     
-    def write_file(self, file_path: Path, units: List[TranslationUnit]) -> None:
-        """Write translated units to Silksong XML file"""
+    def iter_entries(self, file_path: Path, use_index: bool = True, raw: bool = False) -> Iterator[Tuple[str, str]]:
+        """(key, unescaped text) pairs of a .txt or encrypted .json file, without unit objects
         
-        # Ensure output directory exists
-        file_path.parent.mkdir(parents=True, exist_ok=True)
+        raw=True keeps the text exactly as stored in the XML; the index and
+        the unit cache hold unescaped text, so both are bypassed then.
+        """
+        if raw:
+            if Path(file_path).suffix == '.json':
+                script = self._decrypt_script(Path(file_path).read_bytes(), Path(file_path))
+                yield from self._scan_entries(io.StringIO(script, newline=None), raw=True)
+            else:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    yield from self._scan_entries(f, raw=True)
+        elif use_index and self.index is not None and file_path in self.index:
+            for key, text, _ in self.index.entries(file_path):
+                yield key, text
+        elif Path(file_path).suffix == '.json':
+            yield from self._asset_entries(Path(file_path))
+        else:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                yield from self._scan_entries(f)
+    
+    def read_corpus(self, files: Iterable[Path], translations_dir: Path = None,
+                    corpus: Corpus = None, name: Callable[[Path], str] = None) -> Corpus:
+        """Load many files into one columnar Corpus (or append them to corpus)
         
-        # Build XML content
-        xml_lines = ['<entries>']
+        With translations_dir, each file's translation column is filled from
+        its output there (get_output_filename), when that file exists.
+        name maps a path to its file name in the corpus (default: the path).
+        """
+        corpus = corpus if corpus is not None else Corpus()
+        for file_path in files:
+            file = name(Path(file_path)) if name is not None else file_path
+            with metrics.span("read_corpus", file=Path(file_path).name):
+                corpus.add_file(file, self.iter_entries(file_path))
+                if translations_dir is not None:
+                    output = Path(translations_dir) / self.get_output_filename(Path(file_path).name)
+                    if output.exists():
+                        corpus.set_translations(file, self.iter_entries(output))
+        return corpus
+    
+    def _asset_entries(self, file_path: Path) -> List[Tuple[str, str]]:
+        """(key, text) pairs of an encrypted .json asset, decrypted in memory"""
+        raw = file_path.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
         
-        for unit in units:
-            if unit.translated_text:
-                # Escape special XML characters
-                escaped_text = escape(unit.translated_text)
-                xml_lines.append(f'<entry name="{unit.key}">{escaped_text}</entry>')
-            else:
-                # Fallback to original text if no translation
-                escaped_text = escape(unit.original_text)
-                xml_lines.append(f'<entry name="{unit.key}">{escaped_text}</entry>')
+        entries = self._parsed.get(digest)
+        if entries is None and self.unit_cache_dir is not None:
+            entries = self._load_cached_entries(digest)
+        if entries is not None:
+            self.cache_stats["hits"] += 1
+            self._parsed[digest] = entries
+            return entries
+        
+        self.cache_stats["misses"] += 1
+        script = self._decrypt_script(raw, file_path)
+        # newline=None: same universal-newline translation as reading a decrypted .txt
+        entries = list(self._scan_entries(io.StringIO(script, newline=None)))
+        self._parsed[digest] = entries
+        if self.unit_cache_dir is not None:
+            self._store_cached_entries(digest, entries)
+        return entries
+    
+    def _decrypt_script(self, raw: bytes, file_path: Path) -> str:
+        name, script = self.crypto.decrypt_asset(raw)
+        if script is None:
+            raise ValueError(f"{file_path.name} has no m_Script field")
+        return script
+    
+    def _unit_cache_path(self, digest: str) -> Path:
+        return self.unit_cache_dir / f"{digest}.v{UNIT_CACHE_VERSION}.json"
+    
+    def _load_cached_entries(self, digest: str) -> Optional[List[Tuple[str, str]]]:
+        try:
+            with open(self._unit_cache_path(digest), 'r', encoding='utf-8') as f:
+                return [tuple(pair) for pair in json.load(f)]
+        except (OSError, ValueError):
+            return None
+    
+    def _store_cached_entries(self, digest: str, entries: List[Tuple[str, str]]) -> None:
+        """Best effort: a failed cache write only costs a re-parse next time"""
+        try:
+            self.unit_cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=self.unit_cache_dir, suffix=".tmp")
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, ensure_ascii=False)
+            os.replace(tmp_name, self._unit_cache_path(digest))
+        except OSError as e:
+            print(f"Warning: could not cache parsed units: {e}")
+    
+    def _scan_entries(self, f: TextIO, raw: bool = False) -> Iterator[Tuple[str, str]]:
+        """Scan a text stream for entry elements without holding the whole file (raw: keep entities)"""
+        buffer = ''
+        
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            buffer += chunk
+            
+            last_end = 0
+            for match in self.entry_pattern.finditer(buffer):
+                name, text = match.groups()
+                last_end = match.end()
+                # Unescape HTML entities
+                yield name, text if raw else unescape(text)
+            
+            if not chunk:
+                return
+            
+            # Keep only a possibly unfinished entry (or a partial "<entry" at the very end)
+            tail_start = buffer.rfind('<entry', last_end)
+            if tail_start == -1:
+                tail_start = buffer.rfind('<', last_end)
+            buffer = buffer[tail_start:] if tail_start != -1 else ''
+    
+    def write_file(self, file_path: Path, units: Iterable[TranslationUnit]) -> bool:
+        """Write translated units to Silksong XML file
         
-        xml_lines.append('</entries>')
+        Entries are streamed into a temp file next to the target, fsynced and
+        atomically renamed over it. If the produced bytes match what is already
+        on disk the target is left untouched (mtime included).
+        Returns True if the file was written, False if it was unchanged.
+        """
+        file_path = Path(file_path)
+        if self.index is not None:
+            self.index.drop_file(file_path)
+        # Fallback to original text if no translation
+        entries = ((unit.key, unit.translated_text or unit.original_text) for unit in units)
+        with metrics.span("write_file", file=file_path.name):
+            return self._write_atomic(file_path, entries)
+    
+    def _write_atomic(self, file_path: Path, entries: Iterable[Tuple[str, str]]) -> bool:
+        # Ensure output directory exists
+        file_path.parent.mkdir(parents=True, exist_ok=True)
         
+        fd, tmp_name = tempfile.mkstemp(dir=file_path.parent, prefix=f".{file_path.name}.", suffix=".tmp")
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(xml_lines))
+            digest = hashlib.sha256()
+            size = 0
+            with open(fd, 'wb') as f:
+                for chunk in self._iter_xml(entries):
+                    data = chunk.encode('utf-8')
+                    digest.update(data)
+                    size += len(data)
+                    f.write(data)
+                
+                if self._matches_existing(file_path, size, digest.hexdigest()):
+                    unchanged = True
+                else:
+                    unchanged = False
+                    f.flush()
+                    os.fsync(f.fileno())
+            
+            if unchanged:
+                os.unlink(tmp_name)
+                self.write_stats["skipped"] += 1
+                return False
+            
+            # mkstemp creates 0600 files; keep the target's mode (or a normal 0644)
+            mode = file_path.stat().st_mode & 0o777 if file_path.exists() else 0o644
+            os.chmod(tmp_name, mode)
+            os.replace(tmp_name, file_path)
+            self.write_stats["written"] += 1
+            return True
         except Exception as e:
             print(f"Error writing file {file_path}: {e}")
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
             raise
     
+    def _iter_xml(self, entries: Iterable[Tuple[str, str]]) -> Iterator[str]:
+        """Yield the XML document piece by piece, entries separated by newlines"""
+        yield '<entries>'
+        
+        for key, text in entries:
+            # Escape special XML characters, but not the & of a character reference
+            text = _escaped_char_ref.sub(r'&\1;', escape(text))
+            yield f'\n<entry name="{key}">{text}</entry>'
+        
+        yield '\n</entries>'
+    
+    @staticmethod
+    def _matches_existing(file_path: Path, size: int, sha256: str) -> bool:
+        """Check whether file_path already holds exactly these bytes"""
+        try:
+            if file_path.stat().st_size != size:
+                return False
+        except OSError:
+            return False
+        return file_sha256(file_path) == sha256
+    
     def get_output_filename(self, source_filename: str) -> str:
-        """Transform EN_* filename to DE_* filename"""
+        """Transform EN_* filename to DE_* filename (encrypted .json sources give .txt outputs)"""
+        if source_filename.endswith('.json'):
+            source_filename = source_filename[:-len('.json')] + '.txt'
         if source_filename.startswith(f"{self.config.source_lang}_"):
             return source_filename.replace(
                 f"{self.config.source_lang}_", 
@@ -95,9 +280,9 @@ class SilksongProcessor(BaseFileProcessor):
         if not source_dir.exists():
             raise FileNotFoundError(f"Source directory not found: {source_dir}")
         
-        # Look for files starting with source language prefix
+        # Look for files starting with source language prefix: decrypted .txt or encrypted .json
         pattern = f"{self.config.source_lang}_*"
-        return list(source_dir.glob(pattern))
+        return [path for path in source_dir.glob(pattern) if path.suffix in ('.txt', '.json')]
     
     def get_output_path(self, source_file: Path) -> Path:
         """Get full output path for a source file"""
@@ -0,0 +1,132 @@
+"""
+Release builder: translated .txt files -> encrypted .json assets -> installable zip
+Everything stays in memory, and the zip is byte-reproducible for the same inputs
+"""
+import os
+import re
+import time
+import hashlib
+import zipfile
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from src.crypto import SilksongCrypto, resolve_workers
+from src.manifest import file_sha256
+
+RELEASE_ZIP_NAME = "Unpack_to_game.zip"
+# Players unpack the zip into "Hollow Knight Silksong_Data"; the assets live in its Texts folder
+RELEASE_PREFIX = "Texts"
+
+# Fixed metadata so identical inputs always give identical zip bytes
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+ZIP_FILE_MODE = 0o644
+ZIP_COMPRESSLEVEL = 9
+
+_asset_suffix = re.compile(r'-resources\.assets-\d+$')
+
+
+@dataclass
+class ReleaseEntry:
+    """One encrypted asset as stored in the zip"""
+    arcname: str
+    size: int
+    sha256: str
+
+
+@dataclass
+class ReleaseResult:
+    """What build_release produced"""
+    zip_path: Path
+    entries: List[ReleaseEntry] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    sha256: str = ""
+    size: int = 0
+    seconds: float = 0.0
+
+    def manifest(self) -> str:
+        """sha256sum-compatible listing of every asset plus the zip itself"""
+        lines = [f"{entry.sha256}  {entry.arcname}" for entry in self.entries]
+        lines.append(f"{self.sha256}  {self.zip_path.name}")
+        return "\n".join(lines) + "\n"
+
+
+# Per-process crypto instance (also used in-process when workers == 1)
+_worker_crypto: Optional[SilksongCrypto] = None
+
+
+def asset_name(txt_file: Path) -> str:
+    """m_Name of an asset from its file name: DE_Titles-resources.assets-93.txt -> DE_Titles"""
+    return _asset_suffix.sub('', Path(txt_file).stem)
+
+
+def read_asset_source(txt_file: Path) -> bytes:
+    """.txt contents ready for SilksongCrypto.encrypt_asset (name header added if missing)"""
+    raw = Path(txt_file).read_bytes()
+    # step3 output is bare XML; decrypted/edited files start with the asset name line
+    if raw.lstrip().startswith(b'<'):
+        raw = asset_name(txt_file).encode('utf-8') + b'\n' + raw
+    return raw
+
+
+def _encrypt_job(txt_file: str) -> Tuple[str, Optional[bytes]]:
+    """Encrypt one .txt into asset JSON bytes (None if it has no script)"""
+    global _worker_crypto
+    if _worker_crypto is None:
+        _worker_crypto = SilksongCrypto()
+    asset = _worker_crypto.encrypt_asset(read_asset_source(txt_file))
+    return txt_file, asset[1].encode('utf-8') if asset else None
+
+
+def build_release(source_folder: Path, zip_path: Path, workers: int = 0, prefix: str = "") -> ReleaseResult:
+    """Encrypt every .txt in source_folder and write the assets straight into zip_path
+
+    Files are encrypted in a process pool and stored in sorted order under
+    prefix (a folder inside the zip, relative to the game's data folder).
+    The zip is written to a temp file and renamed into place.
+    """
+    started = time.perf_counter()
+    source_folder = Path(source_folder)
+    zip_path = Path(zip_path)
+    files = sorted(source_folder.glob("*.txt"))
+    if not files:
+        raise FileNotFoundError(f"No .txt files in {source_folder}")
+
+    workers = resolve_workers(workers, len(files))
+    if workers <= 1:
+        assets = [_encrypt_job(str(path)) for path in files]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            assets = list(pool.map(_encrypt_job, [str(path) for path in files],
+                                   chunksize=max(1, len(files) // (workers * 4))))
+
+    result = ReleaseResult(zip_path=zip_path)
+    prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+    zip_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=zip_path.parent, prefix=f".{zip_path.name}.", suffix=".tmp")
+    try:
+        with open(fd, 'wb') as f, zipfile.ZipFile(f, 'w') as archive:
+            for txt_file, data in assets:
+                if data is None:
+                    result.skipped.append(Path(txt_file).name)
+                    continue
+                arcname = f"{prefix}{Path(txt_file).stem}.json"
+                info = zipfile.ZipInfo(arcname, date_time=ZIP_DATE_TIME)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.create_system = 3
+                info.external_attr = ZIP_FILE_MODE << 16
+                archive.writestr(info, data, compresslevel=ZIP_COMPRESSLEVEL)
+                result.entries.append(ReleaseEntry(arcname, len(data), hashlib.sha256(data).hexdigest()))
+        # mkstemp creates 0600 files
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, zip_path)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+    result.sha256 = file_sha256(zip_path)
+    result.size = zip_path.stat().st_size
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,280 @@
+"""
+Offline candidate-term mining for glossary extraction
+Capitalization and n-gram statistics pick the entries worth sending to the model
+"""
+import re
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from core.src.core.models import TranslationUnit
+from src.batching import pack_batches
+from src.dedup import dedupe_units
+from src.glossary_matcher import GlossaryMatcher, term_variants
+from src.tokens import estimate_tokens
+
+DEFAULT_EXTRACT_BATCH_TOKENS = 6000
+DEFAULT_EXTRACT_BATCH_ITEMS = 200
+
+# A single word is a name if it is capitalized in at least this share of its occurrences
+MIN_CAPITALIZED_SHARE = 0.5
+MAX_NGRAM = 4
+
+# Capitalized for grammar, not because they name something
+STOPWORDS = frozenset("""
+a an the and or but nor so yet if then than that this these those there here where when what who whom whose
+which why how i i'm i've i'll i'd me my mine we us our you your yours he him his she her it its they them their
+is am are was were be been being do does did done have has had can could will would shall should may might must
+not no yes oh ah ahh eh hm hmm hmph huh ha well now just still even also only very too all any some each every
+of in on at to for from by with without into onto over under up down out off about after before again once
+more most much many such own same other another both few let lets please thank thanks hello goodbye farewell
+come go get see look take give make know think feel want need find keep leave hold press use open close
+new old good bad great little long back way one two three four five six seven eight nine ten
+""".split())
+
+# Page breaks and line breaks end a sentence just like punctuation
+_markup = re.compile(r'<[^<>]*>')
+_sentence_end = re.compile(r'[.!?…:;]+|\n')
+_word = re.compile(r"[A-Za-z]+(?:['’][A-Za-z]+)*")
+_camel = re.compile(r'[a-z][A-Z]')
+_camel_part = re.compile(r'[A-Z][a-z]*|[a-z]+')
+_possessive = re.compile(r"['’]s$")
+
+
+def _clean(text: str) -> str:
+    return _markup.sub('. ', text.replace('&#8217;', "'").replace('&#8216;', "'")
+                       .replace('&#8220;', '"').replace('&#8221;', '"'))
+
+
+def _sentences(text: str) -> List[List[Tuple[str, bool]]]:
+    """Words of each sentence as (word, sentence-initial)"""
+    result = []
+    for sentence in _sentence_end.split(_clean(text)):
+        words = _word.findall(sentence)
+        if words:
+            result.append([(word, index == 0) for index, word in enumerate(words)])
+    return result
+
+
+def _is_capitalized(word: str) -> bool:
+    return word[0].isupper()
+
+
+def _is_title(sentences: List[List[Tuple[str, bool]]]) -> bool:
+    """Short entry in title case, like item and area names ("Sharpdart", "Last Dance")"""
+    if len(sentences) != 1 or len(sentences[0]) > MAX_NGRAM:
+        return False
+    return all(_is_capitalized(word) or word.lower() in STOPWORDS for word, _ in sentences[0])
+
+
+def _base(word: str) -> str:
+    return _possessive.sub('', word)
+
+
+def _camel_runs(word: str) -> List[str]:
+    """Shorter CamelCase names inside a CamelCase word ("GotClingGrip" -> "ClingGrip", "GotCling")"""
+    parts = _camel_part.findall(word)
+    return [''.join(parts[start:stop]) for start in range(len(parts)) for stop in range(start + 2, len(parts) + 1)
+            if stop - start < len(parts)]
+
+
+@dataclass
+class MiningResult:
+    """Candidate terms of a corpus and the entries that contain new ones"""
+    candidates: Counter = field(default_factory=Counter)  # term -> occurrences
+    new_terms: Set[str] = field(default_factory=set)  # candidates not in the known glossary
+    selected: List[TranslationUnit] = field(default_factory=list)  # entries with a new candidate
+    total_units: int = 0
+    skipped_tokens: int = 0
+    selected_tokens: int = 0
+
+    def summary(self) -> str:
+        return (f"{len(self.candidates)} candidate terms ({len(self.new_terms)} new), "
+                f"{len(self.selected)} of {self.total_units} entries to send "
+                f"(~{self.skipped_tokens} prompt tokens skipped)")
+
+
+class TermMiner:
+    """Finds proper-noun candidates with capitalization statistics over the whole corpus
+
+    A single word counts as a name when the corpus mostly writes it
+    capitalized, including mid-sentence. Runs of capitalized words are
+    n-gram candidates even when the words alone are common ("Deep Docks",
+    "Flea Finder"); CamelCase words ("ClingGrip") always are.
+    """
+
+    def __init__(self, known_terms: Iterable[str] = (), min_share: float = MIN_CAPITALIZED_SHARE):
+        self.min_share = min_share
+        self.known: Set[str] = set()
+        for term in known_terms:
+            self.known |= term_variants(term)
+        self._capitalized: Counter = Counter()  # lowercased word -> capitalized mid-sentence
+        self._initial: Counter = Counter()  # lowercased word -> capitalized at sentence start
+        self._lower: Counter = Counter()  # lowercased word -> written in lowercase
+
+    def observe(self, texts: Iterable[str]) -> None:
+        """First pass: capitalization counts of every word"""
+        for text in texts:
+            sentences = _sentences(text)
+            title = _is_title(sentences)
+            for sentence in sentences:
+                for word, initial in sentence:
+                    key = _base(word).lower()
+                    if not _is_capitalized(word):
+                        self._lower[key] += 1
+                    elif initial and not title:
+                        self._initial[key] += 1
+                    else:
+                        self._capitalized[key] += 1
+
+    def is_name(self, word: str) -> bool:
+        """Name-like word, judged by how the corpus writes it"""
+        key = _base(word).lower()
+        if len(key) < 3 or key in STOPWORDS or not _is_capitalized(word):
+            return False
+        if _camel.search(word):
+            return True
+        capitalized = self._capitalized[key] + self._initial[key]
+        if not self._capitalized[key] and self._initial[key] < 2:
+            # Seen only once, at the start of a sentence: could be any word
+            return False
+        return capitalized / (capitalized + self._lower[key]) >= self.min_share
+
+    def candidates_in(self, text: str) -> List[str]:
+        """Candidate terms in one text: name words and their runs of up to MAX_NGRAM words
+
+        >>> TermMiner().candidates_in("CONTINUE")
+        ['CONTINUE']
+        >>> TermMiner().candidates_in("Press EXIT to use the GotClingGrip")
+        ['GotClingGrip', 'GotCling', 'ClingGrip']
+        """
+        found = []
+        sentences = _sentences(text)
+        title = _is_title(sentences)
+        for sentence in sentences:
+            run: List[str] = []  # as written, possessives included
+            for word, _ in sentence + [('', False)]:
+                if word and _is_capitalized(word) and len(word) > 1 and _base(word).lower() not in STOPWORDS:
+                    run.append(word)
+                    continue
+                if run:
+                    found.extend(self._run_candidates(run, title))
+                    run = []
+        return found
+
+    def _run_candidates(self, run: List[str], title: bool) -> List[str]:
+        found = []
+        for word in run:
+            base = _base(word)
+            # Item and area names are often plain nouns ("Longpin", "Tool") the dialogue writes in lowercase
+            if (title and len(base) >= 3) or self.is_name(base):
+                found.append(base)
+            # Only real CamelCase: an all-caps word ("CONTINUE") would split into single letters
+            if _camel.search(base):
+                found.extend(_camel_runs(base))
+        for size in range(2, min(MAX_NGRAM, len(run)) + 1):
+            for start in range(len(run) - size + 1):
+                words = run[start:start + size]
+                # Possessives stay inside the n-gram ("Hunter's Memento") but not at its end
+                found.append(' '.join(words[:-1] + [_base(words[-1])]).replace('’', "'"))
+        return found
+
+    def is_known(self, term: str) -> bool:
+        return bool(term_variants(term) & self.known)
+
+    def mine(self, units: List[TranslationUnit]) -> MiningResult:
+        """Both passes: statistics, then the candidates and new-candidate entries of every unit"""
+        result = MiningResult(total_units=len(units))
+        self.observe(unit.original_text for unit in units)
+        for unit in units:
+            terms = self.candidates_in(unit.original_text)
+            result.candidates.update(terms)
+            new = {term for term in terms if not self.is_known(term)}
+            tokens = estimate_tokens(unit.original_text) if unit.original_text.strip() else 0
+            if new:
+                result.new_terms |= new
+                result.selected.append(unit)
+                result.selected_tokens += tokens
+            else:
+                result.skipped_tokens += tokens
+        return result
+
+
+def extraction_batches(units: List[TranslationUnit], max_tokens: int = DEFAULT_EXTRACT_BATCH_TOKENS,
+                       max_items: int = DEFAULT_EXTRACT_BATCH_ITEMS) -> List[List[TranslationUnit]]:
+    """Selected entries, deduplicated and packed across files into extraction requests"""
+    groups = list(dedupe_units(units).groups.values())
+    plan = pack_batches(groups, max_tokens, max_items)
+    return [[group[0] for group in batch] for batch in plan.batches]
+
+
+class CandidateBatchProcessor:
+    """Processor view for TermExtractor that serves only the mined entries
+
+    Each cross-file batch looks like one source file ({lang}_TermBatch-NNN.txt),
+    so the extractor makes one request per batch instead of one per game file.
+    Everything else is delegated to the wrapped processor.
+    """
+
+    def __init__(self, processor, batches: List[List[TranslationUnit]]):
+        self.processor = processor
+        source_dir = Path(processor.config.source_dir)
+        prefix = processor.config.source_lang
+        self._batches: Dict[str, List[TranslationUnit]] = {
+            str(source_dir / f"{prefix}_TermBatch-{number:03d}.txt"): batch
+            for number, batch in enumerate(batches, 1)
+        }
+
+    def get_all_source_files(self) -> List[Path]:
+        return [Path(name) for name in self._batches]
+
+    def read_file(self, file_path: Path) -> List[TranslationUnit]:
+        return list(self._batches[str(file_path)])
+
+    def __getattr__(self, name):
+        return getattr(self.processor, name)
+
+
+def attribute_terms(terms: Iterable[str], units_by_file: Dict[Path, List[TranslationUnit]]) -> Dict[str, List[str]]:
+    """{source file name: sorted terms occurring in it}, matched against the real files"""
+    matcher = GlossaryMatcher({term: term for term in terms})
+    breakdown = {}
+    for path, units in units_by_file.items():
+        found = matcher.terms_for(unit.original_text for unit in units)
+        if found:
+            breakdown[Path(path).name] = found
+    return breakdown
+
+
+def load_known_terms(*paths: Optional[Path]) -> Set[str]:
+    """Terms of extracted_terms.json ("terms") and final_glossary.json ("translations") files that exist"""
+    known: Set[str] = set()
+    for path in paths:
+        if path is None or not Path(path).exists():
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        terms = data.get("translations") or data.get("terms") or []
+        known.update(terms)
+    return known
+
+
+def merge_extracted_terms(result: Dict, previous: Optional[Dict],
+                          units_by_file: Dict[Path, List[TranslationUnit]], stats: Dict) -> Dict:
+    """TermExtractor output over batches -> the usual extracted_terms structure
+
+    Previously extracted terms are kept (their entries were not re-sent) and
+    file_breakdown is rebuilt against the real game files.
+    """
+    terms = set(result.get("terms") or [])
+    if previous:
+        terms |= set(previous.get("terms") or [])
+    merged = dict(result)
+    merged["terms"] = sorted(terms)
+    merged["total_unique_terms"] = len(terms)
+    merged["file_breakdown"] = attribute_terms(terms, units_by_file)
+    merged.setdefault("failed_files", [])
+    merged["extraction_config"] = {**(result.get("extraction_config") or {}), "term_miner": stats}
+    return merged
@@ -0,0 +1,333 @@
+"""
+Inverted full-text index over source and translated entries
+Tokens (Ukrainian ones stemmed) map to (file, key) postings; glossary consistency queries run on the postings
+"""
+import os
+import re
+import json
+import html
+import tempfile
+from bisect import bisect_left
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.glossary_matcher import GlossaryMatcher
+from src.manifest import file_sha256
+
+# Bump when tokenization or stemming changes
+TEXT_INDEX_VERSION = 1
+DEFAULT_TEXT_INDEX_PATH = "./data/silksong/cache/text_index.json"
+
+SOURCE = "source"
+TARGET = "target"
+
+_markup = re.compile(r'<[^<>]*>')
+_en_word = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_uk_word = re.compile(r"[а-щьюяєіїґ]+(?:['’ʼ][а-щьюяєіїґ]+)*")
+_camel_boundary = re.compile(r'(?<=[a-z])(?=[A-Z])')
+_apostrophe = re.compile(r"['’ʼ]")
+# Translations like "Знак, Герб" or "Дівочі Танці (від щавелю)": alternatives and a comment
+_alternative = re.compile(r'\s*[,;/]\s*')
+_comment = re.compile(r'\([^)]*\)')
+
+# Case and number endings of nouns and adjectives, longest first
+_UK_ENDINGS = sorted("""
+ями ами ові еві ого ому ими іми их іх ій ий ої ою ею єю ом ем ям ам ях ах ів їв ім им
+а я у ю і ї е є о и ь
+""".split(), key=len, reverse=True)
+MIN_STEM = 3
+# Expected stems this long also match derived words ("шовк" -> "шовкова", "шовкозліт")
+MIN_PREFIX_STEM = 4
+_vowels = set("аеєиіїоуюяь")
+
+
+def uk_stem(word: str) -> str:
+    """Light Ukrainian stemmer: "Цитаделлю", "Цитаделі", "Цитадель" -> "цитадел"
+
+    Strips one inflectional ending, a doubled final consonant (instrumental
+    "-ллю") and the і/о alternation of closed syllables ("дзвін"/"дзвону").
+    """
+    word = _apostrophe.sub('', word.lower())
+    for ending in _UK_ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            word = word[:-len(ending)]
+            break
+    if len(word) > MIN_STEM and word[-1] == word[-2] and word[-1] not in _vowels:
+        word = word[:-1]
+    # "дзвін" -> "дзвон", so it matches the oblique cases
+    if len(word) > MIN_STEM and word[-2] == 'і' and word[-1] not in _vowels:
+        word = word[:-2] + 'о' + word[-1]
+    return word
+
+
+def en_token(word: str) -> str:
+    """Lowercase English token without possessive or plural ("Citadel's" -> "citadel")"""
+    word = word.lower()
+    if word.endswith("'s"):
+        word = word[:-2]
+    elif word.endswith('s') and len(word) > 4 and not word.endswith('ss'):
+        word = word[:-1]
+    return word
+
+
+def _plain(text: str) -> str:
+    return html.unescape(_markup.sub(' ', text.replace('&lt;', '<').replace('&gt;', '>')))
+
+
+def source_tokens(text: str) -> List[str]:
+    plain = _camel_boundary.sub(' ', _plain(text)).lower().replace('’', "'")
+    return [en_token(word) for word in _en_word.findall(plain)]
+
+
+def target_tokens(text: str) -> List[str]:
+    return [uk_stem(word) for word in _uk_word.findall(_plain(text).lower())]
+
+
+def expected_forms(translation: str) -> List[Set[str]]:
+    """Stem sets of the accepted renderings of a glossary translation"""
+    forms = []
+    for alternative in _alternative.split(_comment.sub(' ', translation)):
+        stems = set(target_tokens(alternative))
+        if stems:
+            forms.append(stems)
+    return forms
+
+
+def _file_state(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_sha256(path)}
+
+
+def _unchanged(path: Path, state: Optional[Dict[str, Any]]) -> bool:
+    """size/mtime first, sha256 only when those differ (a touch alone is not a change)"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return state is None
+    if state is None or stat.st_size != state["size"]:
+        return False
+    return stat.st_mtime_ns == state["mtime_ns"] or file_sha256(path) == state["sha256"]
+
+
+def _postings(texts: Iterable[str], tokenize) -> Dict[str, List[int]]:
+    postings: Dict[str, List[int]] = {}
+    for row, text in enumerate(texts):
+        for token in dict.fromkeys(tokenize(text or '')):
+            postings.setdefault(token, []).append(row)
+    return postings
+
+
+def build_segment(processor, source: Path, output: Path) -> Dict[str, Any]:
+    """Entries of one source file and its translated output, with postings for both languages"""
+    translated = dict(processor.iter_entries(output)) if output.exists() else {}
+    keys, sources, targets = [], [], []
+    for key, text in processor.iter_entries(source):
+        keys.append(key)
+        sources.append(text)
+        targets.append(translated.get(key))
+    return {
+        "source_state": _file_state(source),
+        "output_state": _file_state(output),
+        "output_path": str(output),
+        "keys": keys,
+        "sources": sources,
+        "targets": targets,
+        SOURCE: _postings(sources, source_tokens),
+        TARGET: _postings(targets, target_tokens),
+    }
+
+
+@dataclass
+class Occurrence:
+    """One entry whose source contains a glossary term"""
+    file: str
+    key: str
+    source: str
+    translation: Optional[str]
+
+
+@dataclass
+class TermCheck:
+    """Occurrences of one glossary term and the ones not rendered as its translation"""
+    term: str
+    expected: str
+    occurrences: int = 0
+    untranslated: int = 0
+    mismatches: List[Occurrence] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class TextIndex:
+    """Per-file segments of postings, persisted as one JSON file
+
+    A segment covers one EN_* source and its DE_* output and is rebuilt only
+    when either file changes, so editing a single translation re-tokenizes
+    one file instead of the corpus.
+    """
+
+    def __init__(self, segments: Dict[str, Dict[str, Any]] = None):
+        self.segments: Dict[str, Dict[str, Any]] = segments or {}
+        # (file, side, token) -> rows, built on first use of a posting list
+        self._sets: Dict[Tuple[str, str, str], Set[int]] = {}
+        self._vocabulary: Optional[List[str]] = None
+        self._derived: Dict[str, List[str]] = {}
+
+    def _rows(self, name: str, side: str, token: str) -> Set[int]:
+        key = (name, side, token)
+        rows = self._sets.get(key)
+        if rows is None:
+            rows = self._sets[key] = set(self.segments[name][side].get(token, ()))
+        return rows
+
+    @classmethod
+    def load(cls, path: Path) -> "TextIndex":
+        """Saved index, or an empty one when it is missing or from another version"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+        if data.get("version") != TEXT_INDEX_VERSION:
+            return cls()
+        return cls(data.get("segments") or {})
+
+    def save(self, path: Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                json.dump({"version": TEXT_INDEX_VERSION, "segments": self.segments}, f,
+                          ensure_ascii=False, separators=(',', ':'))
+            os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+    def refresh(self, processor, files: Iterable[Path], translations_dir: Path) -> List[str]:
+        """Rebuild the segments of new or changed files and drop removed ones; returns rebuilt names"""
+        rebuilt = []
+        current = set()
+        for source in sorted(Path(path) for path in files):
+            output = Path(translations_dir) / processor.get_output_filename(source.name)
+            current.add(source.name)
+            segment = self.segments.get(source.name)
+            if (segment is not None and segment.get("output_path") == str(output)
+                    and _unchanged(source, segment["source_state"])
+                    and _unchanged(output, segment["output_state"])):
+                continue
+            self.segments[source.name] = build_segment(processor, source, output)
+            rebuilt.append(source.name)
+        for name in set(self.segments) - current:
+            del self.segments[name]
+            rebuilt.append(name)
+        if rebuilt:
+            self._sets.clear()
+            self._vocabulary = None
+            self._derived.clear()
+        return rebuilt
+
+    def find(self, tokens: List[str], side: str = SOURCE) -> List[Tuple[str, int]]:
+        """(file, row) of entries containing every token on one side"""
+        hits = []
+        tokens = list(dict.fromkeys(tokens))
+        if not tokens:
+            return hits
+        for name, segment in self.segments.items():
+            postings = segment[side]
+            if not all(token in postings for token in tokens):
+                continue
+            # Intersect starting from the rarest token
+            ordered = sorted(tokens, key=lambda token: len(postings[token]))
+            rows = [row for row in postings[ordered[0]]
+                    if all(row in self._rows(name, side, token) for token in ordered[1:])]
+            hits.extend((name, row) for row in rows)
+        return hits
+
+    def search(self, query: str) -> List[Tuple[str, int]]:
+        """Entries matching query in the source, or in the translation for Cyrillic queries"""
+        if _uk_word.search(query.lower()):
+            return self.find(target_tokens(query), TARGET)
+        return self.find(source_tokens(query), SOURCE)
+
+    def occurrence(self, name: str, row: int) -> Occurrence:
+        segment = self.segments[name]
+        return Occurrence(name, segment["keys"][row], segment["sources"][row], segment["targets"][row])
+
+    def check_terms(self, glossary: Dict[str, str]) -> List[TermCheck]:
+        """Every glossary term with the source entries whose translation lacks all accepted forms
+
+        Entries whose translation has no Ukrainian words at all count as
+        untranslated, not as mismatches.
+        """
+        matcher = GlossaryMatcher(glossary)
+        checks = []
+        for term, translation in sorted(glossary.items()):
+            check = TermCheck(term, translation)
+            forms = expected_forms(translation)
+            tokens = source_tokens(term)
+            for name, row in self.find(tokens, SOURCE):
+                segment = self.segments[name]
+                # Postings only say the words occur; the matcher confirms multi-word phrases
+                if len(set(tokens)) > 1 and term not in matcher.find_terms(segment["sources"][row]):
+                    continue
+                check.occurrences += 1
+                if segment["targets"][row] is None or row not in self._translated(name):
+                    check.untranslated += 1
+                    continue
+                if forms and not any(all(self._has_stem(name, row, stem) for stem in form) for form in forms):
+                    check.mismatches.append(self.occurrence(name, row))
+            checks.append(check)
+        return checks
+
+    def _forms_of(self, stem: str) -> List[str]:
+        """Target stems counted as a rendering of an expected stem: itself and, if long enough, derivations"""
+        if len(stem) < MIN_PREFIX_STEM:
+            return [stem]
+        if stem in self._derived:
+            return self._derived[stem]
+        if self._vocabulary is None:
+            self._vocabulary = sorted({token for segment in self.segments.values() for token in segment[TARGET]})
+        forms = []
+        for token in self._vocabulary[bisect_left(self._vocabulary, stem):]:
+            if not token.startswith(stem):
+                break
+            forms.append(token)
+        self._derived[stem] = forms or [stem]
+        return self._derived[stem]
+
+    def _has_stem(self, name: str, row: int, stem: str) -> bool:
+        return any(row in self._rows(name, TARGET, form) for form in self._forms_of(stem))
+
+    def _translated(self, name: str) -> Set[int]:
+        """Rows of file with at least one Ukrainian word in the translation"""
+        key = (name, TARGET, '')
+        rows = self._sets.get(key)
+        if rows is None:
+            rows = self._sets[key] = {row for posting in self.segments[name][TARGET].values() for row in posting}
+        return rows
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "files": len(self.segments),
+            "entries": sum(len(segment["keys"]) for segment in self.segments.values()),
+            "source_tokens": len({token for segment in self.segments.values() for token in segment[SOURCE]}),
+            "target_stems": len({token for segment in self.segments.values() for token in segment[TARGET]}),
+        }
+
+
+def open_text_index(processor, files: Iterable[Path], translations_dir: Path,
+                    index_path: Path = Path(DEFAULT_TEXT_INDEX_PATH)) -> Tuple[TextIndex, List[str]]:
+    """Load index_path, rebuild only changed files and save it back; returns (index, rebuilt names)"""
+    index = TextIndex.load(index_path)
+    rebuilt = index.refresh(processor, files, translations_dir)
+    if rebuilt or not Path(index_path).exists():
+        index.save(index_path)
+    return index, rebuilt
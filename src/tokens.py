@@ -0,0 +1,22 @@
+"""
+Cheap token estimates for batching and rate limiting (no tokenizer dependency)
+"""
+from typing import Iterable
+
+# System prompt + instructions + JSON framing sent with every request
+PROMPT_OVERHEAD_TOKENS = 250
+
+# Ukrainian output is longer than English input in BPE tokens
+COMPLETION_RATIO = 2.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough BPE token count: ~4 chars per token for ASCII, ~2 for Cyrillic and other scripts"""
+    ascii_chars = len(text.encode('ascii', 'ignore'))
+    return max(1, ascii_chars // 4 + (len(text) - ascii_chars) // 2)
+
+
+def estimate_request_tokens(texts: Iterable[str], overhead: int = PROMPT_OVERHEAD_TOKENS) -> int:
+    """Prompt plus expected completion tokens for translating texts in one request"""
+    prompt = sum(estimate_tokens(text) for text in texts)
+    return int(overhead + prompt * (1 + COMPLETION_RATIO))
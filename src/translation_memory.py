@@ -0,0 +1,210 @@
+"""
+Persistent translation memory in front of the AI provider
+SQLite store keyed by normalized source text, glossary version, model and target language
+"""
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+DEFAULT_MAX_ENTRIES = 200_000
+
+_whitespace = re.compile(r'\s+')
+
+
+def normalize_text(text: str) -> str:
+    """Collapse internal whitespace and strip the ends"""
+    return _whitespace.sub(' ', text).strip()
+
+
+def glossary_version(glossary: Dict[str, str]) -> str:
+    """Short stable hash of glossary contents, so glossary edits invalidate cached lines"""
+    payload = json.dumps(glossary or {}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def rewrap_whitespace(source: str, translation: str) -> str:
+    """Re-apply the requesting text's leading/trailing whitespace to a cached translation"""
+    core = source.strip()
+    if not core:
+        return source
+    start = source.index(core[0])
+    return source[:start] + translation + source[start + len(core):]
+
+
+class TranslationMemory:
+    """SQLite-backed translation cache with hit/miss counters and LRU eviction"""
+
+    def __init__(self, db_path: Path, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        # Translator may call the provider from worker threads
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS memory (
+                key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                glossary_version TEXT NOT NULL,
+                model TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS memory_last_used ON memory(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(text: str, glossary_ver: str, model: str, target_lang: str) -> str:
+        raw = "\x1f".join((normalize_text(text), glossary_ver, model, target_lang))
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def lookup(self, texts: Sequence[str], glossary_ver: str, model: str,
+               target_lang: str) -> Dict[int, str]:
+        """Return {index: translation} for every text found in memory"""
+        keys = [self.make_key(text, glossary_ver, model, target_lang) for text in texts]
+        found = {}
+
+        with self._lock:
+            # Chunked to stay under SQLite's bound parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = list(set(keys[start:start + 500]))
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, translation FROM memory WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE memory SET last_used = ? WHERE key = ?",
+                    [(time.time(), key) for key in found]
+                )
+                self._conn.commit()
+
+            result = {i: rewrap_whitespace(texts[i], found[key]) for i, key in enumerate(keys) if key in found}
+            self.hits += len(result)
+            self.misses += len(texts) - len(result)
+        return result
+
+    def store(self, texts: Sequence[str], translations: Sequence[str], glossary_ver: str,
+              model: str, target_lang: str) -> None:
+        """Remember provider translations; empty results are not cached"""
+        now = time.time()
+        rows = [
+            (self.make_key(text, glossary_ver, model, target_lang), normalize_text(text),
+             translation.strip(), glossary_ver, model, target_lang, now)
+            for text, translation in zip(texts, translations)
+            if translation and translation.strip() and text.strip()
+        ]
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO memory VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+            )
+            self._evict()
+            self._conn.commit()
+
+    def forget(self, texts: Sequence[str], glossary_ver: str, model: str, target_lang: str) -> None:
+        """Drop cached translations of these texts (e.g. ones that failed validation)"""
+        keys = [(self.make_key(text, glossary_ver, model, target_lang),) for text in texts]
+        with self._lock:
+            self._conn.executemany("DELETE FROM memory WHERE key = ?", keys)
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries down to 90% of max_entries"""
+        count = self._conn.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM memory WHERE key IN "
+            "(SELECT key FROM memory ORDER BY last_used LIMIT ?)", (excess,)
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM memory").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM memory")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class CachedProvider:
+    """AI provider wrapper that answers translate_batch from a TranslationMemory first
+
+    Only texts missing from memory are forwarded to the wrapped provider.
+    Every other attribute is delegated, so it can stand in for the provider anywhere.
+    """
+
+    def __init__(self, provider, memory: TranslationMemory, glossary: Dict[str, str] = None,
+                 model_name: Optional[str] = None):
+        self.provider = provider
+        self.memory = memory
+        self.glossary_version = glossary_version(glossary)
+        self.model_key = model_name or getattr(provider, "model_name", type(provider).__name__)
+
+    def set_glossary(self, glossary: Dict[str, str]) -> None:
+        """Key subsequent lookups on this glossary (call after the translator loads it)"""
+        self.glossary_version = glossary_version(glossary)
+
+    def lookup(self, texts: List[str], target_lang: str) -> Dict[int, str]:
+        """{index: translation} for the texts already in memory, without calling the provider"""
+        return self.memory.lookup(texts, self.glossary_version, self.model_key, target_lang)
+
+    def translate_uncached(self, texts: List[str], source_lang: str, target_lang: str,
+                           *args, **kwargs) -> List[str]:
+        """Send texts straight to the provider (the caller already looked them up) and remember the results"""
+        translated = self.provider.translate_batch(texts, source_lang, target_lang, *args, **kwargs)
+        self.memory.store(texts, translated, self.glossary_version, self.model_key, target_lang)
+        return translated
+
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str,
+                        *args, **kwargs) -> List[str]:
+        cached = self.lookup(texts, target_lang)
+        missing = [i for i in range(len(texts)) if i not in cached]
+        if not missing:
+            return [cached[i] for i in range(len(texts))]
+
+        translated = self.translate_uncached([texts[i] for i in missing], source_lang, target_lang,
+                                             *args, **kwargs)
+
+        results = dict(cached)
+        results.update(zip(missing, translated))
+        return [results.get(i, "") for i in range(len(texts))]
+
+    def forget(self, texts: List[str], target_lang: str) -> None:
+        """Make the next translate_batch of these texts go to the provider again"""
+        self.memory.forget(texts, self.glossary_version, self.model_key, target_lang)
+
+    def __getattr__(self, name):
+        return getattr(self.provider, name)
@@ -0,0 +1,315 @@
+"""
+Silksong translator: corpus-wide pipeline on top of the core Translator
+"""
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from core.src.pipeline.translator import Translator
+from core.src.core.models import ProjectConfig, TranslationUnit
+from src.async_engine import AsyncBatchRunner, ProviderLimits
+from src.batching import BatchPlan, DEFAULT_MAX_BATCH_ITEMS, DEFAULT_MAX_BATCH_TOKENS, pack_batches
+from src.corpus import Corpus
+from src.dedup import DedupResult, dedupe_units, fan_out
+from src.glossary_matcher import GlossaryMatcher
+from src.journal import TranslationJournal
+from src.markup import MarkupIssue, check_markup, has_errors
+from src.metrics import metrics
+from src.patch_diff import (PatchDiff, UNCHANGED, asset_base_name, diff_snapshots, load_snapshot,
+                            snapshot_text, text_hash)
+from src.processor import SilksongProcessor
+from src.tokens import estimate_request_tokens, estimate_tokens
+
+
+class SilksongTranslator(Translator):
+    """Translator that reads every file first and sends each unique source text once"""
+
+    def __init__(self, config: ProjectConfig, processor: SilksongProcessor, ai_provider,
+                 batch_size: int = DEFAULT_MAX_BATCH_ITEMS, limits: ProviderLimits = None,
+                 max_retries: int = 5, max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+                 journal: TranslationJournal = None, markup_retries: int = 2):
+        super().__init__(config, processor, ai_provider, batch_size=batch_size)
+        self.config = config
+        self.processor = processor
+        self.ai_provider = ai_provider
+        # batch_size caps texts per request; max_batch_tokens caps estimated prompt tokens
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.limits = limits or ProviderLimits()
+        self.max_retries = max_retries
+        self.engine_stats: Dict[str, Any] = {}
+        self.glossary: Dict[str, str] = {}
+        self.matcher: Optional[GlossaryMatcher] = None
+        self.glossary_stats = {"batches": 0, "terms_injected": 0}
+        self.dedup: Optional[DedupResult] = None
+        self.batch_plan: Optional[BatchPlan] = None
+        self.patch_diff: Optional[PatchDiff] = None
+        # Completed batches are journaled and, on resume, replayed instead of re-requested
+        self.journal = journal
+        self.resumed_texts = 0
+        # Texts answered by a CachedProvider's memory before batching
+        self.cached_texts = 0
+        # Texts whose translation breaks markup are re-sent alone, up to markup_retries times
+        self.markup_retries = markup_retries
+        self.markup_issues: List[MarkupIssue] = []
+        self.markup_stats = {"invalid": 0, "requeued": 0, "fixed": 0, "reverted": 0}
+
+    def translate_all_files(self, max_files: int = None, parallel: bool = True) -> Dict[str, Any]:
+        """Translate all source files, deduplicating identical texts across files"""
+        files = sorted(self.processor.get_all_source_files())
+        if max_files:
+            files = files[:max_files]
+
+        if not self.glossary:
+            self.glossary = self.load_glossary() or {}
+        self.matcher = GlossaryMatcher(self.glossary)
+
+        # Read everything up front so duplicates across files collapse into one request
+        units_by_file: Dict[Path, List[TranslationUnit]] = {}
+        with metrics.span("translate.read"):
+            for file_path in files:
+                units_by_file[file_path] = self.processor.read_file(file_path)
+
+        return self._translate_units(units_by_file, parallel=parallel)
+
+    def translate_patch(self, previous_source_dir: Path, previous_output_dir: Path = None,
+                        max_files: int = None, parallel: bool = True) -> Dict[str, Any]:
+        """Translate only entries added or changed since the previous game version
+
+        Files are matched by name without the asset number, so a patch that
+        renumbers assets still carries every unchanged translation over.
+        """
+        previous_output_dir = Path(previous_output_dir or self.config.get_output_dir())
+        # An old and a renumbered asset of one file: the later one wins, as in load_snapshot
+        files = list({asset_base_name(path.name): path
+                      for path in sorted(self.processor.get_all_source_files())}.values())
+        if max_files:
+            files = files[:max_files]
+
+        if not self.glossary:
+            self.glossary = self.load_glossary() or {}
+        self.matcher = GlossaryMatcher(self.glossary)
+
+        units_by_file: Dict[Path, List[TranslationUnit]] = {}
+        current = Corpus()
+        with metrics.span("translate.read"):
+            for file_path in files:
+                units = self.processor.read_file(file_path)
+                units_by_file[file_path] = units
+                current.add_file(asset_base_name(file_path.name),
+                                 ((unit.key, text_hash(unit.original_text)) for unit in units))
+
+        with metrics.span("translate.patch_diff"):
+            previous, _ = load_snapshot(self.processor, previous_source_dir, self.config.source_lang,
+                                        hashed=True)
+            # Read before anything is written: the previous output may be the output dir itself
+            translations, old_outputs = load_snapshot(self.processor, previous_output_dir,
+                                                      self.config.target_lang_code)
+            self.patch_diff = diff_snapshots(previous, current, bases=current.files if max_files else None)
+        print(f"Patch diff: {self.patch_diff.summary()}")
+
+        pending: List[TranslationUnit] = []
+        carried = 0
+        for file_path, units in units_by_file.items():
+            base = asset_base_name(file_path.name)
+            for unit in units:
+                old = snapshot_text(translations, base, unit.key)
+                if self.patch_diff.status[(base, unit.key)] == UNCHANGED and old is not None:
+                    unit.translated_text = old
+                    carried += 1
+                else:
+                    pending.append(unit)
+        print(f"Carried over {carried} translations, {len(pending)} entries to translate")
+
+        results = self._translate_units(units_by_file, pending=pending, parallel=parallel)
+
+        # Outputs written under a new asset number supersede the old file
+        output_dir = Path(self.config.get_output_dir()).resolve()
+        written = {self.processor.get_output_filename(file_path.name) for file_path in files}
+        stale = [path for base, path in old_outputs.items()
+                 if base in current and path.parent.resolve() == output_dir and path.name not in written]
+        for path in stale:
+            path.unlink()
+            print(f"  Removed superseded {path.name}")
+
+        results.update(self.patch_diff.counts())
+        results["carried_over"] = carried
+        return results
+
+    def _translate_units(self, units_by_file: Dict[Path, List[TranslationUnit]],
+                         pending: List[TranslationUnit] = None, parallel: bool = True) -> Dict[str, Any]:
+        """Dedupe, batch and translate pending units (default: all), then write every file"""
+        if pending is None:
+            pending = [unit for units in units_by_file.values() for unit in units]
+        with metrics.span("translate.dedup"):
+            self.dedup = dedupe_units(pending)
+        print(f"Dedup: {self.dedup.summary()}")
+
+        groups = list(self.dedup.groups.values())
+        if self.journal is not None and self.journal.completed:
+            remaining = []
+            for normalized, units in self.dedup.groups.items():
+                translation = self.journal.completed.get(normalized)
+                if translation is None:
+                    remaining.append(units)
+                else:
+                    fan_out(units, translation)
+            self.resumed_texts = len(groups) - len(remaining)
+            print(f"Resume: {self.resumed_texts} texts replayed from journal, {len(remaining)} left")
+            groups = remaining
+            metrics.cache("journal", self.resumed_texts, len(remaining))
+
+        # Memory hits are answered here, so only real provider calls are batched and rate-limited
+        lookup = getattr(self.ai_provider, 'lookup', None)
+        if lookup is not None and groups:
+            with metrics.span("translate.memory"):
+                cached = lookup([units[0].original_text for units in groups], self.config.target_lang)
+            for index, translation in cached.items():
+                fan_out(groups[index], translation)
+            self.cached_texts = len(cached)
+            groups = [units for index, units in enumerate(groups) if index not in cached]
+            print(f"Translation memory: {self.cached_texts} texts cached, {len(groups)} to request")
+
+        with metrics.span("translate.batching"):
+            self.batch_plan = pack_batches(groups, self.max_batch_tokens, self.batch_size)
+        batches = self.batch_plan.batches
+        print(f"Batching: {self.batch_plan.summary()}")
+
+        # Sequential mode is the same engine with a single request in flight
+        limits = self.limits if parallel else ProviderLimits(
+            1, self.limits.requests_per_minute, self.limits.tokens_per_minute
+        )
+        runner = AsyncBatchRunner(limits, max_retries=self.max_retries)
+        started = time.perf_counter()
+        with metrics.span("translate.provider"):
+            outcomes = runner.run(batches, self._request_batch, cost=self._batch_cost)
+        self.engine_stats = runner.stats
+
+        failed = self._apply_outcomes(batches, outcomes)
+        with metrics.span("translate.validate"):
+            # Replayed journal entries are checked too: they may predate the validator
+            self._repair_markup(list(self.dedup.groups.values()), runner)
+
+        with metrics.span("translate.write"):
+            for file_path, units in units_by_file.items():
+                self.processor.write_file(self.processor.get_output_path(file_path), units)
+        metrics.count("batches_failed", failed)
+        metrics.count("requests", runner.stats["requests"])
+        metrics.count("retries", runner.stats["retries"])
+
+        return {
+            "files": len(units_by_file),
+            "units": self.dedup.total_units,
+            "unique_texts": len(groups),
+            "resumed_texts": self.resumed_texts,
+            "cached_texts": self.cached_texts,
+            "dedup_ratio": self.dedup.ratio,
+            "batches": len(batches),
+            "tokens_per_request": self.batch_plan.average_tokens,
+            "glossary_terms_per_request": (self.glossary_stats["terms_injected"] /
+                                           max(1, self.glossary_stats["batches"])),
+            "failed_batches": failed,
+            "markup_invalid": self.markup_stats["invalid"],
+            "markup_fixed": self.markup_stats["fixed"],
+            "markup_reverted": self.markup_stats["reverted"],
+            "requests": runner.stats["requests"],
+            "retries": runner.stats["retries"],
+            "seconds": time.perf_counter() - started,
+        }
+
+    def _apply_outcomes(self, batches: List[List[List[TranslationUnit]]], outcomes: List[Any]) -> int:
+        """Fan every returned translation out to its units; returns the number of failed batches"""
+        failed = 0
+        for batch, outcome in zip(batches, outcomes):
+            if isinstance(outcome, Exception):
+                failed += 1
+                print(f"  Error translating batch ({len(batch)} texts): {outcome}")
+                continue
+            for units, translation in zip(batch, outcome):
+                fan_out(units, translation)
+        return failed
+
+    def _invalid_groups(self, groups: List[List[TranslationUnit]]) -> Dict[int, List[Tuple[str, str]]]:
+        """{index in groups: issues} for translated groups whose markup does not match the source"""
+        invalid = {}
+        for index, units in enumerate(groups):
+            unit = units[0]
+            if unit.translated_text:
+                issues = check_markup(unit.original_text, unit.translated_text)
+                if issues:
+                    invalid[index] = issues
+        return invalid
+
+    def _repair_markup(self, groups: List[List[TranslationUnit]], runner: AsyncBatchRunner) -> None:
+        """Re-send only the texts whose translation fails validation
+
+        Failing texts are re-batched on their own (not with their original
+        batch) and dropped from the translation memory first, so the provider
+        really translates them again. Whatever still has markup errors after
+        the last round falls back to the source text; warnings are kept.
+        """
+        invalid = self._invalid_groups(groups)
+        self.markup_stats["invalid"] = len(invalid)
+        if not invalid:
+            return
+        print(f"Validation: {len(invalid)} texts with broken markup or suspicious length")
+
+        for attempt in range(1, self.markup_retries + 1):
+            retry = [groups[index] for index in invalid]
+            forget = getattr(self.ai_provider, 'forget', None)
+            if forget is not None:
+                forget([units[0].original_text for units in retry], self.config.target_lang)
+            plan = pack_batches(retry, self.max_batch_tokens, self.batch_size)
+            print(f"  Re-queue {attempt}/{self.markup_retries}: {len(retry)} texts in {len(plan.batches)} requests")
+            self.markup_stats["requeued"] += len(retry)
+            metrics.count("markup_requeued", len(retry))
+            self._apply_outcomes(plan.batches, runner.run(plan.batches, self._request_batch, cost=self._batch_cost))
+
+            still = self._invalid_groups(retry)
+            invalid = {index: still[position] for position, index in enumerate(invalid) if position in still}
+            if not invalid:
+                break
+        self.markup_stats["fixed"] = self.markup_stats["invalid"] - len(invalid)
+
+        self.markup_issues = []
+        for index, issues in invalid.items():
+            units = groups[index]
+            source_file = Path(units[0].metadata.get('source_file', '')).name
+            self.markup_issues.extend(MarkupIssue(units[0].key, kind, message, source_file)
+                                      for kind, message in issues)
+            if has_errors(issues):
+                for unit in units:
+                    unit.translated_text = None
+                self.markup_stats["reverted"] += 1
+        metrics.count("markup_invalid", self.markup_stats["invalid"])
+        metrics.count("markup_reverted", self.markup_stats["reverted"])
+        print(f"Validation: {self.markup_stats['fixed']} fixed, {self.markup_stats['reverted']} "
+              f"kept in the source language, {len(invalid) - self.markup_stats['reverted']} with warnings only")
+
+    def _request_batch(self, groups: List[List[TranslationUnit]]) -> List[str]:
+        """Send one batch of unique texts to the provider with only the glossary terms it uses"""
+        texts = [units[0].original_text for units in groups]
+        with metrics.span("translate.prompt"):
+            glossary = self.matcher.subset(texts)
+        self.glossary_stats["batches"] += 1
+        self.glossary_stats["terms_injected"] += len(glossary)
+        started = time.perf_counter()
+        # Batches hold only memory misses (see _translate_units); don't look them up twice
+        translate = getattr(self.ai_provider, 'translate_uncached', self.ai_provider.translate_batch)
+        translations = translate(
+            texts, self.config.source_lang, self.config.target_lang, glossary=glossary
+        )
+        if self.journal is not None:
+            keys = [[(unit.metadata.get('source_file', ''), unit.key) for unit in units] for units in groups]
+            self.journal.record(keys, texts, translations,
+                                provider=getattr(self.ai_provider, 'model_name', None),
+                                glossary_terms=len(glossary),
+                                seconds=round(time.perf_counter() - started, 3))
+        return translations
+
+    def _batch_cost(self, groups: List[List[TranslationUnit]]) -> int:
+        """Estimated prompt + completion tokens, charged against the TPM bucket"""
+        texts = [units[0].original_text for units in groups]
+        glossary_tokens = sum(estimate_tokens(f"{term}: {translation}")
+                              for term, translation in self.matcher.subset(texts).items())
+        return estimate_request_tokens(texts) + glossary_tokens
@@ -0,0 +1,201 @@
+"""
+Watch mode: re-encrypt a localization file into the game folder as soon as it is saved
+inotify (through ctypes) on Linux, mtime polling everywhere else
+"""
+import os
+import sys
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import tempfile
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Callable, Dict, Optional, Set, Tuple
+
+from src.crypto import SilksongCrypto
+from src.release import read_asset_source
+
+DEFAULT_DEBOUNCE = 0.05
+DEFAULT_POLL_INTERVAL = 0.05
+
+# <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Names of files in one folder that were written and closed, or renamed into it
+
+    Covers both plain saves and editors that save via a temp file and rename.
+    """
+
+    def __init__(self, folder: Path):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self._fd, os.fsencode(str(folder)), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"inotify_add_watch failed for {folder}")
+
+    def changes(self, timeout: Optional[float]) -> Set[str]:
+        """Block up to timeout seconds (None = forever) and return changed file names"""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        names = set()
+        if not ready:
+            return names
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return names
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Portable fallback: compares (mtime, size) of every file on each poll"""
+
+    def __init__(self, folder: Path, interval: float = DEFAULT_POLL_INTERVAL):
+        self.folder = Path(folder)
+        self.interval = interval
+        self._state = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        state = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    state[entry.name] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def changes(self, timeout: Optional[float]) -> Set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self.interval if deadline is None else
+                       max(0.0, min(self.interval, deadline - time.monotonic())))
+            state = self._scan()
+            changed = {name for name, stamp in state.items() if self._state.get(name) != stamp}
+            self._state = state
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self) -> None:
+        pass
+
+
+def make_watcher(folder: Path, polling: bool = False):
+    """inotify on Linux when available, polling otherwise"""
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(folder)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), polling instead")
+    return PollingWatcher(folder)
+
+
+@dataclass
+class RebuildResult:
+    """Outcome of rebuilding one edited file"""
+    file: str
+    ok: bool
+    message: str = ""
+    units: int = 0
+    seconds: float = 0.0
+
+
+def validate_file(processor, txt_file: Path) -> Tuple[int, str]:
+    """(units parsed, problem or "") -- every <entry> must parse and the root must be closed"""
+    text = txt_file.read_text(encoding='utf-8')
+    units = sum(1 for _ in processor.iter_entries(txt_file))
+    entries = text.count('<entry ')
+    if '<entries>' not in text or '</entries>' not in text:
+        return units, "missing <entries> root element"
+    if units != entries:
+        return units, f"only {units} of {entries} entries parse (check quotes, < and > in text)"
+    return units, ""
+
+
+def rebuild_file(crypto: SilksongCrypto, processor, txt_file: Path, output_folder: Path) -> RebuildResult:
+    """Validate one edited .txt, encrypt it and atomically replace its .json in output_folder"""
+    started = time.perf_counter()
+    result = RebuildResult(file=txt_file.name, ok=False)
+    try:
+        result.units, problem = validate_file(processor, txt_file)
+        if problem:
+            result.message = problem
+            return result
+        asset = crypto.encrypt_asset(read_asset_source(txt_file))
+        if asset is None:
+            result.message = "insufficient lines"
+            return result
+
+        output_file = Path(output_folder) / f"{txt_file.stem}.json"
+        fd, tmp_name = tempfile.mkstemp(dir=output_folder, prefix=f".{output_file.name}.", suffix=".tmp")
+        try:
+            with open(fd, 'w', encoding='utf-8') as f:
+                f.write(asset[1])
+            os.chmod(tmp_name, 0o644)
+            os.replace(tmp_name, output_file)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+        result.ok = True
+    except (OSError, ValueError) as e:
+        result.message = str(e)
+    finally:
+        result.seconds = time.perf_counter() - started
+    return result
+
+
+def watch_folder(source_folder: Path, output_folder: Path, processor, pattern: str = "*.txt",
+                 debounce: float = DEFAULT_DEBOUNCE, polling: bool = False,
+                 on_result: Callable[[RebuildResult], None] = None, stop: Callable[[], bool] = None) -> None:
+    """Rebuild every file matching pattern shortly after it is saved, until stop() is true
+
+    A file is rebuilt once no further save arrived for `debounce` seconds, so
+    editors that write several times per save trigger a single rebuild.
+    """
+    source_folder = Path(source_folder)
+    output_folder = Path(output_folder)
+    output_folder.mkdir(parents=True, exist_ok=True)
+    crypto = SilksongCrypto()
+    watcher = make_watcher(source_folder, polling)
+    pending: Dict[str, float] = {}  # name -> time it becomes due
+
+    try:
+        while not (stop and stop()):
+            now = time.monotonic()
+            timeout = max(0.0, min(pending.values()) - now) if pending else 0.5
+            for name in watcher.changes(timeout):
+                if fnmatch(name, pattern):
+                    pending[name] = time.monotonic() + debounce
+
+            now = time.monotonic()
+            for name in [name for name, due in pending.items() if due <= now]:
+                del pending[name]
+                txt_file = source_folder / name
+                if not txt_file.exists():
+                    continue
+                result = rebuild_file(crypto, processor, txt_file, output_folder)
+                if on_result:
+                    on_result(result)
+    finally:
+        watcher.close()